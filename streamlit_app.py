@@ -2,6 +2,12 @@ import streamlit as st
 from snowflake.snowpark.context import get_active_session
 import pandas as pd
 import time
+import hashlib
+import json
+import threading
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
 # Custom CSS for styling
 st.markdown(
@@ -126,36 +132,103 @@ st.markdown(
     unsafe_allow_html=True
 )
 
+# Audit events are buffered in memory and written in multi-row batches: when enough events
+# are waiting, when the oldest has waited long enough, and at the end of every run.
+AUDIT_TABLES = {
+    "masking": "PROD_DB_MANAGER.PUBLIC.MASKING_AUDIT",
+    "synthetic": "PROD_DB_MANAGER.PUBLIC.SYNTHETIC_AUDIT",
+    "encryption": "PROD_DB_MANAGER.PUBLIC.ENCRYPTION_AUDIT",
+}
+AUDIT_FLUSH_MAX_EVENTS = 50
+AUDIT_FLUSH_INTERVAL_SECONDS = 10
+AUDIT_BUFFER_MAX_EVENTS = 1000  # oldest events are dropped beyond this if flushes keep failing
+
+@st.cache_resource
+def _audit_buffer():
+    """Process-wide audit buffer; pipeline worker threads log into it as well."""
+    return {"events": [], "identities": {}, "last_error": None, "flushing": False, "lock": threading.Lock()}
+
+def _audit_identity(session):
+    """(user, role) of a session, looked up once per session."""
+    buffer = _audit_buffer()
+    with buffer["lock"]:
+        cached = buffer["identities"].get(id(session))
+    if cached is not None:
+        return cached[1], cached[2]
+    current_user = session.get_current_user().replace('"', '')
+    current_role = session.get_current_role().replace('"', '')
+    with buffer["lock"]:
+        # Keep the session itself in the entry so its id cannot be reused while cached
+        buffer["identities"][id(session)] = (session, current_user, current_role)
+    return current_user, current_role
+
 # Function to log actions to the specified audit table
-def log_audit(action, status, audit_type):
-    """Log an action to the specified audit table."""
+def log_audit(action, status, audit_type, session=None, duration_seconds=None):
+    """Queue an audit event for the specified audit table; per-step events can carry a duration."""
     try:
-        session = get_active_session()
-        current_user = session.get_current_user().replace('"', '')
-        current_role = session.get_current_role().replace('"', '')
-
-        if audit_type == "masking":
-            audit_sql = f"""
-            INSERT INTO PROD_DB_MANAGER.PUBLIC.MASKING_AUDIT (
-                ACTIVITY, 
-                ACTIVITY_STATUS, 
-                ROLE, 
-                "USER_NAME", 
-                ROW_CREATE_DATE, 
-                ROW_MOD_DATE
+        session = session or get_active_session()
+        if audit_type not in AUDIT_TABLES:
+            return
+        current_user, current_role = _audit_identity(session)
+        if duration_seconds is not None:
+            action = f"{action} ({duration_seconds:.1f}s)"
+        buffer = _audit_buffer()
+        with buffer["lock"]:
+            buffer["events"].append({
+                "audit_type": audit_type,
+                "action": action,
+                "status": status,
+                "role": current_role,
+                "user": current_user,
+                "logged_at": time.time(),
+            })
+            events = buffer["events"]
+            # At most one background flush at a time, however many events arrive while it runs
+            due = not buffer["flushing"] and (
+                len(events) >= AUDIT_FLUSH_MAX_EVENTS
+                or time.time() - events[0]["logged_at"] >= AUDIT_FLUSH_INTERVAL_SECONDS
             )
-            VALUES (
-                '{action}',
-                '{status}', 
-                '{current_role}',
-                '{current_user}',
-                CURRENT_TIMESTAMP(),
-                CURRENT_TIMESTAMP()
-            );
-            """
-        elif audit_type == "synthetic":
-            audit_sql = f"""
-            INSERT INTO PROD_DB_MANAGER.PUBLIC.SYNTHETIC_AUDIT (
+            if due:
+                buffer["flushing"] = True
+        if due:
+            # Flush off the caller's thread so a slow or failing write never holds up a pipeline
+            threading.Thread(target=flush_audit_events, args=(session,), daemon=True).start()
+    except Exception:
+        # Auditing must never interrupt the action being audited
+        pass
+
+def flush_audit_events(session=None):
+    """Write buffered audit events, one multi-row INSERT per audit table.
+
+    Returns False when a write failed; the failed events stay buffered for the next flush.
+    """
+    buffer = _audit_buffer()
+    with buffer["lock"]:
+        events, buffer["events"] = buffer["events"], []
+    try:
+        return _write_audit_events(buffer, events, session) if events else True
+    finally:
+        with buffer["lock"]:
+            buffer["flushing"] = False
+
+def _write_audit_events(buffer, events, session):
+    """Insert events per audit table; failed events go back to the front of the buffer."""
+    failed = []
+    error = None
+    session = session or get_active_session()
+    for audit_type, table in AUDIT_TABLES.items():
+        table_events = [event for event in events if event["audit_type"] == audit_type]
+        if not table_events:
+            continue
+        values = ",\n".join("(?, ?, ?, ?, TO_TIMESTAMP_LTZ(?, 3), CURRENT_TIMESTAMP())" for _ in table_events)
+        params = [
+            value
+            for event in table_events
+            for value in (event["action"], event["status"], event["role"], event["user"], int(event["logged_at"] * 1000))
+        ]
+        try:
+            session.sql(f"""
+            INSERT INTO {table} (
                 ACTIVITY, 
                 ACTIVITY_STATUS, 
                 ROLE, 
@@ -163,38 +236,1217 @@ def log_audit(action, status, audit_type):
                 ROW_CREATE_DATE, 
                 ROW_MOD_DATE
             )
-            VALUES (
-                '{action}',
-                '{status}', 
-                '{current_role}',
-                '{current_user}',
-                CURRENT_TIMESTAMP(),
-                CURRENT_TIMESTAMP()
-            );
-            """
-        elif audit_type == "encryption":
-            audit_sql = f"""
-            INSERT INTO PROD_DB_MANAGER.PUBLIC.ENCRYPTION_AUDIT (
-                ACTIVITY, 
-                ACTIVITY_STATUS, 
-                ROLE, 
-                "USER_NAME", 
-                ROW_CREATE_DATE, 
-                ROW_MOD_DATE
+            VALUES {values}
+            """, params=params).collect()
+        except Exception as e:
+            failed.extend(table_events)
+            error = str(e)
+
+    with buffer["lock"]:
+        buffer["last_error"] = error
+        if failed:
+            buffer["events"] = (failed + buffer["events"])[-AUDIT_BUFFER_MAX_EVENTS:]
+    return not failed
+
+# Query instrumentation: statements run through execute_sql and the fetch helpers record their
+# query ID, step, timing, rows and warehouse. Records are grouped by run for the Query Timings
+# panel, which only lists the runs of the current browser session, and written to
+# QUERY_METRICS_TABLE in batches once enough have waited or the oldest has waited long enough.
+QUERY_METRICS_TABLE = "DEV_DB_MANAGER.MASKING.QUERY_METRICS"
+QUERY_METRICS_MAX_RECORDS = 2000
+QUERY_METRICS_FLUSH_MAX_RECORDS = 200
+QUERY_METRICS_FLUSH_INTERVAL_SECONDS = 60
+
+def metrics_session_id():
+    """Id of the current browser session; runs carry it so each session only sees its own."""
+    if "metrics_session_id" not in st.session_state:
+        st.session_state.metrics_session_id = uuid.uuid4().hex
+    return st.session_state.metrics_session_id
+
+# Each script run is an instrumentation run of its own; background work passes its own run
+SCRIPT_RUN = {
+    "run_id": uuid.uuid4().hex,
+    "label": f"Page run {time.strftime('%H:%M:%S')}",
+    "session_id": metrics_session_id(),
+}
+
+@st.cache_resource
+def _query_metrics():
+    """Process-wide query metrics; pipeline worker threads record into it as well."""
+    return {
+        "records": deque(maxlen=QUERY_METRICS_MAX_RECORDS),
+        "unsaved": [],
+        "warehouses": {},
+        "table_ready": False,
+        "flushing": False,
+        "lock": threading.Lock(),
+    }
+
+def _session_warehouse(session):
+    """Current warehouse of a session, looked up once per session."""
+    metrics = _query_metrics()
+    with metrics["lock"]:
+        cached = metrics["warehouses"].get(id(session))
+    if cached is None:
+        try:
+            warehouse = (session.get_current_warehouse() or "").replace('"', '')
+        except Exception:
+            warehouse = None
+        # Keep the session itself in the entry so its id cannot be reused while cached
+        cached = (session, warehouse)
+        with metrics["lock"]:
+            metrics["warehouses"][id(session)] = cached
+    return cached[1]
+
+def record_query(step, query_id, started_at, rows, session=None, run=None, error=None):
+    """Record one executed statement under a run ({"run_id", "label", "session_id"}; defaults to this script run)."""
+    session = session or get_active_session()
+    run = run or SCRIPT_RUN
+    ended_at = time.time()
+    record = {
+        "RUN_ID": run["run_id"],
+        "RUN_LABEL": run["label"],
+        "SESSION_ID": run["session_id"],
+        "STEP": step,
+        "QUERY_ID": query_id,
+        "STARTED_AT": started_at,
+        "ENDED_AT": ended_at,
+        "ELAPSED_SECONDS": round(ended_at - started_at, 3),
+        "ROWS": rows,
+        "WAREHOUSE": _session_warehouse(session),
+        "STATUS": "FAILED" if error else "SUCCESS",
+        "ERROR": error,
+    }
+    metrics = _query_metrics()
+    with metrics["lock"]:
+        metrics["records"].append(record)
+        unsaved = metrics["unsaved"] = (metrics["unsaved"] + [record])[-QUERY_METRICS_MAX_RECORDS:]
+        due = not metrics["flushing"] and (
+            len(unsaved) >= QUERY_METRICS_FLUSH_MAX_RECORDS
+            or ended_at - unsaved[0]["ENDED_AT"] >= QUERY_METRICS_FLUSH_INTERVAL_SECONDS
+        )
+        if due:
+            metrics["flushing"] = True
+    if due:
+        # Flush off the caller's thread so the write never adds a round trip to a rerun
+        threading.Thread(target=flush_query_metrics, args=(session,), daemon=True).start()
+
+def execute_sql(sql, step, session=None, run=None, params=None):
+    """Run a statement with optional bind parameters, record it and return its rows.
+
+    Statements are submitted with collect_nowait() so the query ID is known without an extra
+    round trip.
+    """
+    session = session or get_active_session()
+    started_at = time.time()
+    query_id = None
+    try:
+        handle = session.sql(sql, params=params).collect_nowait()
+        query_id = handle.query_id
+        rows = handle.result()
+    except Exception as e:
+        record_query(step, query_id, started_at, None, session, run, str(e))
+        raise
+    record_query(step, query_id, started_at, len(rows), session, run)
+    return rows
+
+def flush_query_metrics(session=None):
+    """Persist recorded metrics; failures keep them for the next flush and never raise."""
+    metrics = _query_metrics()
+    with metrics["lock"]:
+        records, metrics["unsaved"] = metrics["unsaved"], []
+    try:
+        return _write_query_metrics(metrics, records, session) if records else True
+    finally:
+        with metrics["lock"]:
+            metrics["flushing"] = False
+
+def _write_query_metrics(metrics, records, session):
+    """One multi-row INSERT of records; on failure they go back to the front of the unsaved list."""
+    session = session or get_active_session()
+    try:
+        if not metrics["table_ready"]:
+            session.sql(f"""
+                CREATE TABLE IF NOT EXISTS {QUERY_METRICS_TABLE} (
+                    RUN_ID VARCHAR,
+                    RUN_LABEL VARCHAR,
+                    STEP_NAME VARCHAR,
+                    QUERY_ID VARCHAR,
+                    STARTED_AT TIMESTAMP_LTZ,
+                    ENDED_AT TIMESTAMP_LTZ,
+                    ELAPSED_SECONDS FLOAT,
+                    ROWS_RETURNED NUMBER,
+                    WAREHOUSE VARCHAR,
+                    STATUS VARCHAR,
+                    ERROR_MESSAGE VARCHAR,
+                    ROW_CREATE_DATE TIMESTAMP_LTZ
+                )
+            """).collect()
+            metrics["table_ready"] = True
+        values = ",\n".join(
+            "(?, ?, ?, ?, TO_TIMESTAMP_LTZ(?, 3), TO_TIMESTAMP_LTZ(?, 3), ?, ?, ?, ?, ?, CURRENT_TIMESTAMP())"
+            for _ in records
+        )
+        params = [
+            value
+            for record in records
+            for value in (
+                record["RUN_ID"], record["RUN_LABEL"], record["STEP"], record["QUERY_ID"],
+                int(record["STARTED_AT"] * 1000), int(record["ENDED_AT"] * 1000), record["ELAPSED_SECONDS"],
+                record["ROWS"], record["WAREHOUSE"], record["STATUS"], record["ERROR"],
             )
-            VALUES (
-                '{action}',
-                '{status}', 
-                '{current_role}',
-                '{current_user}',
-                CURRENT_TIMESTAMP(),
-                CURRENT_TIMESTAMP()
-            );
-            """
+        ]
+        session.sql(f"INSERT INTO {QUERY_METRICS_TABLE} VALUES {values}", params=params).collect()
+        return True
+    except Exception:
+        with metrics["lock"]:
+            metrics["unsaved"] = (records + metrics["unsaved"])[-QUERY_METRICS_MAX_RECORDS:]
+        return False
+
+def query_metrics_dataframe(run_id):
+    """Per-statement timing of one of this session's runs, in execution order."""
+    session_id = metrics_session_id()
+    with _query_metrics()["lock"]:
+        records = [record for record in _query_metrics()["records"]
+                   if record["RUN_ID"] == run_id and record["SESSION_ID"] == session_id]
+    columns = ["STEP", "ELAPSED_SECONDS", "ROWS", "STATUS", "QUERY_ID", "WAREHOUSE", "ERROR"]
+    return pd.DataFrame(records, columns=["STARTED_AT"] + columns).sort_values("STARTED_AT")[columns]
+
+def last_query_id(step, run=None):
+    """Query ID of the latest statement recorded for a step in a run (defaults to this script run)."""
+    run = run or SCRIPT_RUN
+    with _query_metrics()["lock"]:
+        for record in reversed(_query_metrics()["records"]):
+            if record["RUN_ID"] == run["run_id"] and record["STEP"] == step:
+                return record["QUERY_ID"]
+    return None
+
+# Shared fetch layer: list and report queries come back through Snowpark's Arrow path
+# (to_pandas / to_pandas_batches) and are recorded like every other statement.
+def _column_values(series):
+    """Column values as Python objects, with SQL NULLs as None rather than NaN."""
+    return series.astype(object).where(series.notna(), None).tolist()
+
+def fetch_dataframe(sql, label=None, params=None):
+    """Run a query and return its result as a pandas DataFrame."""
+    session = get_active_session()
+    label = label or " ".join(sql.split())[:80]
+    started_at = time.time()
+    query_id = None
+    try:
+        handle = session.sql(sql, params=params).to_pandas(block=False)
+        query_id = handle.query_id
+        df = handle.result()
+    except Exception as e:
+        record_query(label, query_id, started_at, None, session, error=str(e))
+        raise
+    record_query(label, query_id, started_at, len(df), session)
+    if st.session_state.get("fetch_compare_collect"):
+        # Same query through the row-by-row path, for comparison in the timings panel
+        execute_sql(sql, f"{label} [collect()]", session, params=params)
+    return df
+
+def fetch_column(sql, label=None, params=None):
+    """Return the first column of a query's result as a list."""
+    df = fetch_dataframe(sql, label, params)
+    return _column_values(df.iloc[:, 0]) if len(df.columns) else []
+
+def fetch_mapping(sql, label=None, params=None):
+    """Return {first column: second column} for a two-column query."""
+    df = fetch_dataframe(sql, label, params)
+    return dict(zip(_column_values(df.iloc[:, 0]), _column_values(df.iloc[:, 1])))
+
+def iter_dataframes(sql, label=None, params=None):
+    """Stream a large result as pandas DataFrame batches; the record covers the whole stream."""
+    session = get_active_session()
+    label = label or " ".join(sql.split())[:80]
+    started_at = time.time()
+    rows = 0
+    for batch in session.sql(sql, params=params).to_pandas_batches():
+        rows += len(batch)
+        yield batch
+    record_query(label, None, started_at, rows, session)
+
+# Query builder: values travel as bind parameters ("?" placeholders) and object names are
+# quoted, so a statement's text is the same for every selection and Snowflake can reuse its
+# compiled plan and cached result. Repeated statements are declared once in SQL_STATEMENTS;
+# their {slots} take object names and their "?" placeholders take params.
+def quote_identifier(*parts):
+    """Quote the parts of an object name: ("PROD_A", "S1") -> "PROD_A"."S1"."""
+    return ".".join('"' + str(part).replace('"', '""') + '"' for part in parts)
+
+def manager_database(environment):
+    """The DB_MANAGER database of an environment, e.g. DEV_DB_MANAGER."""
+    return f"{environment}_DB_MANAGER"
+
+SQL_STATEMENTS = {
+    # Metadata
+    "databases": "SELECT DATABASE_NAME FROM INFORMATION_SCHEMA.DATABASES",
+    "schemas": "SELECT SCHEMA_NAME FROM {database}.INFORMATION_SCHEMA.SCHEMATA",
+    "tables": """
+        SELECT TABLE_NAME
+        FROM {database}.INFORMATION_SCHEMA.TABLES
+        WHERE TABLE_SCHEMA = ? AND TABLE_TYPE = 'BASE TABLE'
+    """,
+    "schema_columns": """
+        SELECT TABLE_NAME, COLUMN_NAME, ORDINAL_POSITION, DATA_TYPE
+        FROM {database}.INFORMATION_SCHEMA.COLUMNS
+        WHERE TABLE_SCHEMA = ?
+        ORDER BY TABLE_NAME, ORDINAL_POSITION
+    """,
+    "row_counts": """
+        SELECT TABLE_NAME, ROW_COUNT
+        FROM {database}.INFORMATION_SCHEMA.TABLES
+        WHERE TABLE_SCHEMA = ?
+    """,
+    "views": """
+        SELECT TABLE_NAME
+        FROM {database}.INFORMATION_SCHEMA.VIEWS
+        WHERE TABLE_SCHEMA = ?
+    """,
+    # Server-side span (first start to last end) of groups of this session's queries, bound as
+    # a JSON object {label: [query ids]}
+    "query_spans": """
+        SELECT ids.key AS LABEL,
+               DATEDIFF('millisecond', MIN(h.START_TIME), MAX(h.END_TIME)) / 1000 AS ELAPSED_SECONDS
+        FROM TABLE(FLATTEN(INPUT => PARSE_JSON(?))) ids,
+             TABLE(FLATTEN(INPUT => ids.value)) query_id,
+             TABLE(INFORMATION_SCHEMA.QUERY_HISTORY_BY_SESSION(RESULT_LIMIT => 10000)) h
+        WHERE h.QUERY_ID = query_id.value::VARCHAR
+        GROUP BY ids.key
+    """,
+    # Lookups
+    "bu_names": "SELECT DISTINCT BU_NAME FROM {manager_database}.MASKING.CONSUMER",
+    "classification_owner_index": """
+        SELECT database_name, schema_name, MIN(classification_owner) AS classification_owner
+        FROM (
+            SELECT database_name, schema_name, classification_owner
+            FROM DEV_DB_MANAGER.MASKING.RAW_CLASSIFICATION_DETAILS
+            QUALIFY import_id = MAX(import_id) OVER (PARTITION BY database_name, schema_name)
+        )
+        GROUP BY database_name, schema_name
+    """,
+    # Masking and encryption procedures
+    "altr_tag_mapper": """
+        CALL ALTR_DSAAS_DB.PUBLIC.ALTR_TAG_MAPPER(
+            MAPPING_FILE_PATH => BUILD_SCOPED_FILE_URL(@ALTR_DSAAS_DB.PUBLIC.ALTR_TAG_MAPPER_STAGE, 'gdlp-to-hipaa-map.json'),
+            TAG_DB => ?,
+            TAG_SCHEMA => 'MASKING',
+            RUN_COMMENT => ?,
+            USE_DATABASES => ?,
+            EXECUTE_SQL => FALSE,
+            LOG_TABLE => 'CLASSIFICATION_DETAILS'
+        )
+    """,
+    "altr_classification_details": "CALL DEV_DB_MANAGER.MASKING.ALTR_CLASSIFICATION_DETAILS(?, ?)",
+    "transfer_classification_details": "CALL DEV_DB_MANAGER.MASKING.TRANSFER_CLASSIFICATION_DETAILS(?, ?, ?)",
+    "metadata_refresh": "CALL {manager_database}.MASKING.UPDATE_METADATA_REFRESH_DATABASE(?)",
+    "column_tag_mapping": "CALL {manager_database}.MASKING.COLUMN_TAG_MAPPING(?, ?, ?, ?, ?)",
+    "insert_data_output_final": "CALL {manager_database}.MASKING.INSERT_DATA_OUTPUT_FINAL(?, ?, ?, ?)",
+    "insert_data_output_final_encryption": "CALL {manager_database}.MASKING.INSERT_DATA_OUTPUT_FINAL_ENCRYPTION(?, ?, ?, ?)",
+    "classification_report": "CALL DEV_DB_MANAGER.MASKING.CLASSIFICATION_REPORT_V1(?, ?, ?)",
+    "create_views": "CALL {manager_database}.MASKING.CREATE_VIEWS(?, ?, ?, ?)",
+    "encrypt_tables": "CALL {manager_database}.ENCRYPTION.ENCRYPT_TABLES(?, ?, ?, ?)",
+    # Synthetic data; the GENERATE_SYNTHETIC_DATA configuration object is bound as JSON
+    "generate_synthetic_data": "CALL SNOWFLAKE.DATA_PRIVACY.GENERATE_SYNTHETIC_DATA(PARSE_JSON(?)::OBJECT)",
+    # Pipeline job bookkeeping; the steps of a new job are bound as one JSON array
+    "pipeline_job_steps_insert": """
+        INSERT INTO DEV_DB_MANAGER.MASKING.PIPELINE_JOB_STEPS
+            (JOB_ID, PIPELINE, RUN_KEY, STEP_NAME, STEP_ORDER, STATUS, INPUT_HASH, ROW_CREATE_DATE, ROW_MOD_DATE)
+        SELECT ?, ?, ?,
+               step.value:name::VARCHAR, step.value:order::NUMBER, step.value:status::VARCHAR,
+               step.value:input_hash::VARCHAR, SYSDATE(), SYSDATE()
+        FROM TABLE(FLATTEN(INPUT => PARSE_JSON(?))) step
+    """,
+    "pipeline_job_step_update": """
+        UPDATE DEV_DB_MANAGER.MASKING.PIPELINE_JOB_STEPS
+        SET STATUS = ?,
+            STARTED_AT = IFF(?, SYSDATE(), STARTED_AT),
+            ENDED_AT = IFF(?, SYSDATE(), ENDED_AT),
+            ERROR_MESSAGE = NULLIF(?, ''),
+            ROW_MOD_DATE = SYSDATE()
+        WHERE JOB_ID = ? AND STEP_NAME = ?
+    """,
+    "pipeline_last_job": """
+        SELECT JOB_ID, STEP_NAME, STEP_ORDER, STATUS, ERROR_MESSAGE, INPUT_HASH,
+               DATE_PART(EPOCH_SECOND, STARTED_AT) AS STARTED_AT,
+               DATE_PART(EPOCH_SECOND, ENDED_AT) AS ENDED_AT,
+               DATE_PART(EPOCH_SECOND, ROW_CREATE_DATE) AS CREATED_AT
+        FROM DEV_DB_MANAGER.MASKING.PIPELINE_JOB_STEPS
+        WHERE PIPELINE = ? AND RUN_KEY = ?
+        QUALIFY JOB_ID = FIRST_VALUE(JOB_ID) OVER (ORDER BY ROW_CREATE_DATE DESC)
+        ORDER BY STEP_ORDER
+    """,
+    # Masking validation: the rows behind each validation metric, keyed by the columns the
+    # row-level diff compares; the metric itself is the row count
+    "validation_source_tables": """
+        SELECT TABLE_NAME
+        FROM {database}.INFORMATION_SCHEMA.TABLES
+        WHERE TABLE_CATALOG = ?
+          AND TABLE_SCHEMA = ?
+          AND TABLE_TYPE = 'BASE TABLE'
+          AND TABLE_NAME NOT LIKE 'RAW_%'
+          AND TABLE_NAME NOT LIKE 'VW_%'
+    """,
+    "validation_md_tables": """
+        SELECT t.TABLE_NAME
+        FROM {manager_database}.MASKING.MD_TABLE t
+        JOIN {manager_database}.MASKING.MD_SCHEMA s ON t.SCHEMA_ID = s.SCHEMA_ID
+        JOIN {manager_database}.MASKING.MD_DATABASE d ON s.DATABASE_ID = d.DATABASE_ID
+        WHERE d.DATABASE_NAME = ?
+          AND s.SCHEMA_NAME = ?
+    """,
+    "validation_source_columns": """
+        SELECT c.TABLE_NAME, c.COLUMN_NAME
+        FROM {database}.INFORMATION_SCHEMA.COLUMNS c
+        JOIN {database}.INFORMATION_SCHEMA.TABLES t
+          ON c.TABLE_SCHEMA = t.TABLE_SCHEMA AND c.TABLE_NAME = t.TABLE_NAME
+        WHERE c.TABLE_SCHEMA = ?
+          AND t.TABLE_TYPE = 'BASE TABLE'
+          AND c.TABLE_NAME NOT LIKE 'RAW_%'
+          AND c.TABLE_NAME NOT LIKE 'VW_%'
+    """,
+    "validation_md_columns": """
+        SELECT tb.TABLE_NAME, col.COLUMN_NAME
+        FROM {manager_database}.MASKING.MD_DATABASE db
+        JOIN {manager_database}.MASKING.MD_SCHEMA sc ON db.DATABASE_ID = sc.DATABASE_ID
+        JOIN {manager_database}.MASKING.MD_TABLE tb ON sc.SCHEMA_ID = tb.SCHEMA_ID
+        JOIN {manager_database}.MASKING.MD_COLUMN col ON tb.TABLE_ID = col.TABLE_ID
+        WHERE db.DATABASE_NAME = ?
+          AND sc.SCHEMA_NAME = ?
+          AND db.IS_ACTIVE = TRUE
+          AND sc.IS_ACTIVE = TRUE
+          AND tb.IS_ACTIVE = TRUE
+          AND col.IS_ACTIVE = TRUE
+    """,
+    "validation_data_set_columns": """
+        SELECT DISTINCT
+            ds.data_output_id,
+            d.database_name,
+            s.schema_name,
+            t.table_name,
+            c.column_name
+        FROM {manager_database}.MASKING.DATA_SET ds
+        INNER JOIN {manager_database}.MASKING.MD_DATABASE d ON ds.database_id = d.database_id
+        INNER JOIN {manager_database}.MASKING.MD_SCHEMA s ON ds.schema_id = s.schema_id
+        INNER JOIN {manager_database}.MASKING.MD_TABLE t ON ds.TABLE_ID = t.TABLE_ID
+        INNER JOIN {manager_database}.MASKING.MD_COLUMN c ON ds.COLUMN_ID = c.COLUMN_ID
+        WHERE d.database_name = ?
+          AND s.schema_name = ?
+          AND ds.data_output_id = (
+              SELECT MAX(ds1.data_output_id)
+              FROM {manager_database}.MASKING.DATA_SET ds1
+              INNER JOIN {manager_database}.MASKING.MD_DATABASE d1 ON ds1.database_id = d1.database_id
+              INNER JOIN {manager_database}.MASKING.MD_SCHEMA s1 ON ds1.schema_id = s1.schema_id
+              WHERE d1.database_name = ?
+                AND s1.schema_name = ?
+          )
+    """,
+    "validation_masked_views": """
+        SELECT TABLE_NAME
+        FROM {masked_database}.INFORMATION_SCHEMA.VIEWS
+        WHERE TABLE_SCHEMA = ?
+    """,
+    "validation_classified_columns": """
+        SELECT "TABLE" AS TABLE_NAME, "COLUMN" AS COLUMN_NAME
+        FROM DEV_DB_MANAGER.MASKING.CLASSIFICATION_DETAILS
+        WHERE "DATABASE" = ?
+          AND "SCHEMA" = ?
+          AND CLASSIFICATION_OWNER = ?
+    """,
+    "validation_masked_tags": """
+        SELECT OBJECT_NAME AS TABLE_NAME, COLUMN_NAME
+        FROM DEV_DB_MANAGER.ACCOUNT_USAGE.TAG_REFERENCES
+        WHERE OBJECT_DATABASE = ?
+          AND OBJECT_SCHEMA = ?
+          AND DOMAIN = 'COLUMN'
+    """,
+}
+
+def sql_statement(name, **identifiers):
+    """Render a named statement, quoting the object names filled into its slots."""
+    return SQL_STATEMENTS[name].format(**{slot: quote_identifier(value) for slot, value in identifiers.items()})
+
+# Metadata catalog shared by all pages. INFORMATION_SCHEMA lookups are cached per
+# session with a TTL and LRU eviction, keyed by (environment, database, schema).
+METADATA_CACHE_TTL_SECONDS = 600
+METADATA_CACHE_MAX_ENTRIES = 256
+
+def _metadata_catalog():
+    """Return the session-scoped metadata catalog, creating it on first use."""
+    if "metadata_catalog" not in st.session_state:
+        st.session_state.metadata_catalog = {
+            "entries": OrderedDict(),
+            "hits": 0,
+            "misses": 0,
+        }
+    return st.session_state.metadata_catalog
+
+def cached_metadata(kind, loader, environment=None, database=None, schema=None, table=None):
+    """Return a cached metadata lookup, calling loader() on a miss or expired entry."""
+    catalog = _metadata_catalog()
+    key = (kind, environment, database, schema, table)
+    now = time.time()
+    entry = catalog["entries"].get(key)
+    if entry is not None and now - entry["loaded_at"] < METADATA_CACHE_TTL_SECONDS:
+        catalog["entries"].move_to_end(key)
+        catalog["hits"] += 1
+        return entry["value"]
+
+    catalog["misses"] += 1
+    value = loader()
+    catalog["entries"][key] = {"value": value, "loaded_at": now}
+    catalog["entries"].move_to_end(key)
+    while len(catalog["entries"]) > METADATA_CACHE_MAX_ENTRIES:
+        catalog["entries"].popitem(last=False)
+    return value
+
+def refresh_metadata(database=None):
+    """Drop cached metadata for one database, or the whole catalog when no database is given."""
+    catalog = _metadata_catalog()
+    if database is None:
+        catalog["entries"].clear()
+        return
+    # The database index is cheap to rebuild and may be missing newly created copies
+    for key in [key for key in catalog["entries"] if key[2] == database or key[0] == "database_index"]:
+        del catalog["entries"][key]
+
+# Environments the app works with; database names are prefixed with one of these
+ENVIRONMENTS = ["DEV", "QA", "UAT", "PROD"]
+DERIVED_DATABASE_SUFFIXES = ("_MASKED", "_ENCRYPT")
+
+def build_database_index(database_names):
+    """Group database names by environment prefix and link _MASKED/_ENCRYPT copies to their base database."""
+    index = {
+        "all": sorted(database_names),
+        "by_environment": {env: {"base": [], "all": []} for env in ENVIRONMENTS},
+        "derived": {},
+    }
+    for name in index["all"]:
+        # Only a trailing suffix marks the copy of a base database (PROD_B_MASKED_OLD is not PROD_B's)
+        suffix = next((suffix for suffix in DERIVED_DATABASE_SUFFIXES if name.endswith(suffix)), None)
+        if suffix:
+            index["derived"].setdefault(name[:-len(suffix)], {})[suffix.lstrip("_")] = name
+
+        env = name.split("_", 1)[0]
+        if env in index["by_environment"] and "_" in name:
+            index["by_environment"][env]["all"].append(name)
+            # Any database carrying a derived suffix stays out of the base pickers
+            if not any(derived in name for derived in DERIVED_DATABASE_SUFFIXES):
+                index["by_environment"][env]["base"].append(name)
+    return index
+
+def get_database_index():
+    """Return the account-wide database index, fetched with a single query per session."""
+    def load():
+        return build_database_index(fetch_column(sql_statement("databases"), "Database index"))
+
+    return cached_metadata("database_index", load)
+
+def get_derived_database(database, kind):
+    """Return the existing MASKED/ENCRYPT copy of a database, or None when it has not been created."""
+    return get_database_index()["derived"].get(database, {}).get(kind)
+
+# Functions to fetch databases, schemas, tables and columns through the metadata catalog
+def get_databases(env_prefix=None, exclude_derived=True):
+    """List databases for an environment prefix, optionally hiding _MASKED/_ENCRYPT copies."""
+    index = get_database_index()
+    if not env_prefix:
+        return list(index["all"])
+    environment = index["by_environment"].get(env_prefix, {"base": [], "all": []})
+    return list(environment["base"] if exclude_derived else environment["all"])
+
+def get_schemas(database):
+    if not database:
+        return []
+
+    def load():
+        return fetch_column(sql_statement("schemas", database=database), f"Schemas in {database}")
+
+    return cached_metadata("schemas", load, database=database)
+
+def get_tables_for_schema(database, schema):
+    if not database or not schema:
+        return []
+
+    def load():
+        return fetch_column(sql_statement("tables", database=database), f"Tables in {database}.{schema}", [schema])
+
+    return cached_metadata("tables", load, database=database, schema=schema)
+
+def get_schema_columns(database, schema):
+    """Fetch every column of a schema in one query, grouped per table in ordinal order."""
+    if not database or not schema:
+        return {}
+
+    def load():
+        df = fetch_dataframe(sql_statement("schema_columns", database=database), f"Columns in {database}.{schema}", [schema])
+        schema_columns = {}
+        for table_name, column_name, position, data_type in zip(
+            df["TABLE_NAME"], df["COLUMN_NAME"], df["ORDINAL_POSITION"].tolist(), df["DATA_TYPE"]
+        ):
+            schema_columns.setdefault(table_name, []).append({
+                "name": column_name,
+                "position": position,
+                "data_type": data_type,
+            })
+        return schema_columns
+
+    return cached_metadata("schema_columns", load, database=database, schema=schema)
+
+def get_columns_for_table(database, schema, table):
+    return [column["name"] for column in get_schema_columns(database, schema).get(table, [])]
+
+# Async query engine: statements run as Snowpark async jobs (collect_nowait) under a
+# concurrency cap. Run state lives in session state so it survives Streamlit reruns.
+DEFAULT_MAX_CONCURRENT_QUERIES = 4
+ASYNC_POLL_INTERVAL_SECONDS = 2
+
+def start_async_queries(run_name, jobs, max_concurrency=DEFAULT_MAX_CONCURRENT_QUERIES):
+    """Register a run of [{"name": ..., "sql": ..., "params": [...]}] jobs and submit the first batch."""
+    if "async_runs" not in st.session_state:
+        st.session_state.async_runs = {}
+    run = {
+        "metrics_run": {
+            "run_id": uuid.uuid4().hex,
+            "label": f"{run_name} {time.strftime('%H:%M:%S')}",
+            "session_id": metrics_session_id(),
+        },
+        "max_concurrency": max(1, int(max_concurrency)),
+        "started_at": time.time(),
+        "finished_at": None,
+        "reported": False,
+        "jobs": [
+            {
+                "name": job["name"],
+                "sql": job["sql"],
+                "params": job.get("params") or None,
+                "status": "QUEUED",
+                "query_id": None,
+                "handle": None,
+                "started_at": None,
+                "finished_at": None,
+                "error": None,
+                "result": None,
+            }
+            for job in jobs
+        ],
+    }
+    st.session_state.async_runs[run_name] = run
+    advance_async_queries(run)
+    return run
+
+def get_async_run(run_name):
+    return st.session_state.get("async_runs", {}).get(run_name)
 
-        session.sql(audit_sql).collect()
+def advance_async_queries(run):
+    """Collect finished jobs and submit queued ones up to the concurrency cap; return True when the run is done."""
+    session = get_active_session()
+    for job in run["jobs"]:
+        if job["status"] != "RUNNING":
+            continue
+        try:
+            if not job["handle"].is_done():
+                continue
+            job["result"] = job["handle"].result()
+            job["status"] = "SUCCESS"
+        except Exception as e:
+            job["status"] = "FAILED"
+            job["error"] = str(e)
+        job["finished_at"] = time.time()
+        # Finish time is as seen by the poller, so it can trail the query by up to one poll interval
+        record_query(
+            job["name"], job["query_id"], job["started_at"],
+            len(job["result"]) if job["result"] is not None else None,
+            session, run["metrics_run"], job["error"],
+        )
+
+    running = sum(1 for job in run["jobs"] if job["status"] == "RUNNING")
+    for job in run["jobs"]:
+        if running >= run["max_concurrency"]:
+            break
+        if job["status"] != "QUEUED":
+            continue
+        job["started_at"] = time.time()
+        try:
+            job["handle"] = session.sql(job["sql"], params=job["params"]).collect_nowait()
+            job["query_id"] = job["handle"].query_id
+            job["status"] = "RUNNING"
+            running += 1
+        except Exception as e:
+            job["status"] = "FAILED"
+            job["error"] = str(e)
+            job["finished_at"] = time.time()
+
+    done = all(job["status"] in ("SUCCESS", "FAILED") for job in run["jobs"])
+    if done and run["finished_at"] is None:
+        run["finished_at"] = time.time()
+    return done
+
+def render_async_run(run):
+    """Draw a run's status table without blocking the script; return True when the run is done.
+
+    While jobs are outstanding the table is drawn by a fragment that re-checks the run every
+    poll interval and reruns the page once it finishes, so callers render results on that rerun.
+    """
+    if advance_async_queries(run):
+        st.dataframe(async_run_dataframe(run), use_container_width=True)
+        return True
+    _async_run_status(run)
+    return False
+
+@st.fragment(run_every=ASYNC_POLL_INTERVAL_SECONDS)
+def _async_run_status(run):
+    if advance_async_queries(run):
+        st.rerun()
+    st.dataframe(async_run_dataframe(run), use_container_width=True)
+
+def async_run_dataframe(run):
+    """Per-job status, timing and error for display."""
+    now = time.time()
+    rows = []
+    for job in run["jobs"]:
+        elapsed = None
+        if job["started_at"] is not None:
+            elapsed = round((job["finished_at"] or now) - job["started_at"], 1)
+        rows.append({
+            "JOB": job["name"],
+            "STATUS": job["status"],
+            "ELAPSED_SECONDS": elapsed,
+            "QUERY_ID": job["query_id"],
+            "ERROR": job["error"],
+        })
+    return pd.DataFrame(rows, columns=["JOB", "STATUS", "ELAPSED_SECONDS", "QUERY_ID", "ERROR"])
+
+# Background pipeline jobs: stored-procedure pipelines run on a worker thread so that
+# reruns and browser refreshes do not interrupt them. Step state is kept in a
+# process-wide registry and persisted to PIPELINE_JOB_STEPS, which also serves as the
+# checkpoint store for resuming a failed run. Its timestamps are written with SYSDATE()
+# (UTC) so that DATE_PART(EPOCH_SECOND, ...) lines up with time.time().
+PIPELINE_JOB_TABLE = "DEV_DB_MANAGER.MASKING.PIPELINE_JOB_STEPS"
+PIPELINE_POLL_INTERVAL_SECONDS = 2
+PIPELINE_MAX_PARALLEL_STEPS = 4
+# Finished jobs stay in the registry this long so open pages can still render their outcome
+PIPELINE_JOB_RETENTION_SECONDS = 900
+
+@st.cache_resource
+def _pipeline_job_registry():
+    """Process-wide registry of pipeline jobs, shared by every session of the app."""
+    return {"jobs": {}, "table_ready": False, "lock": threading.Lock()}
+
+def _prune_pipeline_jobs(registry):
+    """Drop jobs that finished more than the retention period ago; call with the registry lock held.
+    Persisted jobs are still found through the job table afterwards."""
+    cutoff = time.time() - PIPELINE_JOB_RETENTION_SECONDS
+    for job_id in [job_id for job_id, job in registry["jobs"].items()
+                   if job["finished_at"] is not None and job["finished_at"] < cutoff]:
+        del registry["jobs"][job_id]
+
+def _ensure_pipeline_job_table(session):
+    registry = _pipeline_job_registry()
+    if registry["table_ready"]:
+        return True
+    try:
+        session.sql(f"""
+            CREATE TABLE IF NOT EXISTS {PIPELINE_JOB_TABLE} (
+                JOB_ID VARCHAR,
+                PIPELINE VARCHAR,
+                RUN_KEY VARCHAR,
+                STEP_NAME VARCHAR,
+                STEP_ORDER NUMBER,
+                STATUS VARCHAR,
+                STARTED_AT TIMESTAMP_NTZ,
+                ENDED_AT TIMESTAMP_NTZ,
+                ERROR_MESSAGE VARCHAR,
+                INPUT_HASH VARCHAR,
+                ROW_CREATE_DATE TIMESTAMP_NTZ,
+                ROW_MOD_DATE TIMESTAMP_NTZ
+            )
+        """).collect()
+        registry["table_ready"] = True
+    except Exception:
+        return False
+    return True
+
+def _persist_pipeline_steps(session, job, steps):
+    """Write step state to the job table; persistence problems never stop the pipeline."""
+    if not job["persisted"]:
+        return
+    try:
+        for step in steps:
+            session.sql(sql_statement("pipeline_job_step_update"), params=[
+                step["status"],
+                step["status"] == "RUNNING",
+                step["status"] in ("SUCCESS", "FAILED"),
+                step["error"],
+                job["job_id"],
+                step["name"],
+            ]).collect()
+    except Exception:
+        job["persisted"] = False
+
+def validate_pipeline(steps):
+    """Raise ValueError unless every dependency names an earlier step, which also rules out cycles."""
+    declared = set()
+    for step in steps:
+        unknown = [name for name in step.get("depends_on", []) if name not in declared]
+        if unknown:
+            raise ValueError(f"Step {step['name']} depends on undeclared or later steps: {', '.join(unknown)}")
+        declared.add(step["name"])
+
+def _step_input_hash(sql, params=()):
+    """Fingerprint of a step's inputs: its statement with whitespace normalised, plus its bind values."""
+    fingerprint = " ".join(sql.split())
+    if params:
+        fingerprint += "\n" + repr([str(value) for value in params])
+    return hashlib.sha256(fingerprint.encode("utf-8")).hexdigest()
+
+def checkpointed_steps(steps, previous_job):
+    """Names of steps that can be reused from a previous run: they succeeded there with the same
+    inputs and every step they depend on is reused as well."""
+    if previous_job is None:
+        return set()
+    previous_steps = {step["name"]: step for step in previous_job["steps"]}
+    reused = set()
+    for step in steps:
+        previous = previous_steps.get(step["name"])
+        if (previous is not None
+                and previous["status"] in ("SUCCESS", "REUSED")
+                and previous.get("input_hash") == _step_input_hash(step["sql"], step.get("params", []))
+                and all(name in reused for name in step.get("depends_on", []))):
+            reused.add(step["name"])
+    return reused
+
+def start_pipeline_job(pipeline, run_key, steps, audit_message, audit_type, resume_from=None,
+                       max_parallel_steps=PIPELINE_MAX_PARALLEL_STEPS):
+    """Start a DAG of [{"name", "sql", "params", "depends_on"}] steps on a worker thread and return the job.
+
+    When resume_from is a previous job for the same run key, steps checkpointed there are
+    marked REUSED instead of running again.
+    """
+    validate_pipeline(steps)
+    session = get_active_session()
+    reused = checkpointed_steps(steps, resume_from)
+    job = {
+        "job_id": uuid.uuid4().hex,
+        "pipeline": pipeline,
+        "run_key": run_key,
+        "resumed_from": resume_from["job_id"] if resume_from else None,
+        "max_parallel_steps": max(1, int(max_parallel_steps)),
+        "status": "RUNNING",
+        "started_at": time.time(),
+        "finished_at": None,
+        "reported": False,
+        "persisted": _ensure_pipeline_job_table(session),
+        "audit_message": audit_message,
+        "audit_type": audit_type,
+        "metrics_run": None,
+        "steps": [
+            {
+                "name": step["name"],
+                "sql": step["sql"],
+                "params": list(step.get("params", [])),
+                "depends_on": list(step.get("depends_on", [])),
+                "input_hash": _step_input_hash(step["sql"], step.get("params", [])),
+                "order": order,
+                "status": "REUSED" if step["name"] in reused else "QUEUED",
+                "started_at": None,
+                "finished_at": None,
+                "error": None,
+            }
+            for order, step in enumerate(steps, start=1)
+        ],
+    }
+    if job["persisted"]:
+        try:
+            step_rows = json.dumps([
+                {"name": step["name"], "order": step["order"], "status": step["status"], "input_hash": step["input_hash"]}
+                for step in job["steps"]
+            ])
+            session.sql(
+                sql_statement("pipeline_job_steps_insert"), params=[job["job_id"], pipeline, run_key, step_rows]
+            ).collect()
+        except Exception:
+            job["persisted"] = False
+
+    job["metrics_run"] = {"run_id": job["job_id"], "label": f"{pipeline} {run_key}", "session_id": metrics_session_id()}
+
+    registry = _pipeline_job_registry()
+    with registry["lock"]:
+        _prune_pipeline_jobs(registry)
+        registry["jobs"][job["job_id"]] = job
+    threading.Thread(target=_run_pipeline_job, args=(session, job), daemon=True).start()
+    return job
+
+def _run_pipeline_step(session, job, step):
+    try:
+        execute_sql(step["sql"], step["name"], session, job["metrics_run"], params=step["params"] or None)
+        step["status"] = "SUCCESS"
     except Exception as e:
-        st.error(f"❌ Error logging to audit: {str(e)}", icon="🚨")
+        step["status"] = "FAILED"
+        step["error"] = str(e)
+    step["finished_at"] = time.time()
+
+def _run_pipeline_job(session, job):
+    """Worker thread body: run every step whose dependencies succeeded, independent steps in parallel."""
+    steps_by_name = {step["name"]: step for step in job["steps"]}
+    running = {}
+    with ThreadPoolExecutor(max_workers=job["max_parallel_steps"]) as executor:
+        while True:
+            # Steps are declared in dependency order, so one pass settles every step that can be settled now
+            for step in job["steps"]:
+                if step["status"] != "QUEUED":
+                    continue
+                dependency_statuses = [steps_by_name[name]["status"] for name in step["depends_on"]]
+                if any(status in ("FAILED", "SKIPPED") for status in dependency_statuses):
+                    step["status"] = "SKIPPED"
+                    _persist_pipeline_steps(session, job, [step])
+                elif all(status in ("SUCCESS", "REUSED") for status in dependency_statuses):
+                    step["status"] = "RUNNING"
+                    step["started_at"] = time.time()
+                    _persist_pipeline_steps(session, job, [step])
+                    running[executor.submit(_run_pipeline_step, session, job, step)] = step
+
+            if not running:
+                break
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                step = running.pop(future)
+                _persist_pipeline_steps(session, job, [step])
+                log_audit(
+                    f"{job['audit_message']} - step {step['name']}",
+                    "Failure" if step["status"] == "FAILED" else "Success",
+                    job["audit_type"],
+                    session=session,
+                    duration_seconds=step["finished_at"] - step["started_at"],
+                )
+
+    failed = any(step["status"] == "FAILED" for step in job["steps"])
+    job["status"] = "FAILED" if failed else "SUCCESS"
+    job["finished_at"] = time.time()
+    # Classification steps may have loaded a new import
+    invalidate_classification_owners()
+    log_audit(job["audit_message"], "Failure" if failed else "Success", job["audit_type"], session=session)
+    flush_audit_events(session)
+    flush_query_metrics(session)
+
+def find_pipeline_job(pipeline, run_key):
+    """Return the most recent job for a run key, from the registry or else from the job table.
+
+    The job table is read at most once per session and run key; the outcome, including
+    "no job", is kept in session state so reruns do not query it again.
+    """
+    if "pipeline_job_lookups" not in st.session_state:
+        st.session_state.pipeline_job_lookups = {}
+    lookups = st.session_state.pipeline_job_lookups
+
+    registry = _pipeline_job_registry()
+    with registry["lock"]:
+        _prune_pipeline_jobs(registry)
+        jobs = [job for job in registry["jobs"].values()
+                if job["pipeline"] == pipeline and job["run_key"] == run_key]
+    if jobs:
+        lookups[(pipeline, run_key)] = max(jobs, key=lambda job: job["started_at"])
+    elif (pipeline, run_key) not in lookups:
+        lookups[(pipeline, run_key)] = _load_pipeline_job(pipeline, run_key)
+    return lookups[(pipeline, run_key)]
+
+def _load_pipeline_job(pipeline, run_key):
+    """Rebuild the most recent persisted job for a run key from the job table, or None."""
+    try:
+        rows = execute_sql(sql_statement("pipeline_last_job"), "Load last pipeline job", params=[pipeline, run_key])
+    except Exception:
+        return None
+    if not rows:
+        return None
+
+    steps = [
+        {
+            "name": row["STEP_NAME"],
+            "sql": None,
+            "depends_on": [],
+            "input_hash": row["INPUT_HASH"],
+            "order": row["STEP_ORDER"],
+            "status": row["STATUS"],
+            "started_at": row["STARTED_AT"],
+            "finished_at": row["ENDED_AT"],
+            "error": row["ERROR_MESSAGE"],
+        }
+        for row in rows
+    ]
+    finished = all(step["status"] in ("SUCCESS", "REUSED", "FAILED", "SKIPPED") for step in steps)
+    return {
+        "job_id": rows[0]["JOB_ID"],
+        "pipeline": pipeline,
+        "run_key": run_key,
+        "resumed_from": None,
+        # A job table row still RUNNING without a live worker was interrupted by an app restart
+        "status": ("FAILED" if any(step["status"] == "FAILED" for step in steps) else "SUCCESS") if finished else "INTERRUPTED",
+        "started_at": rows[0]["CREATED_AT"],
+        "finished_at": max((step["finished_at"] or 0) for step in steps) or None,
+        "reported": True,
+        "persisted": True,
+        "steps": steps,
+    }
+
+def pipeline_job_dataframe(job):
+    """Per-step status, elapsed time and error for display."""
+    now = time.time()
+    rows = []
+    for step in job["steps"]:
+        elapsed = None
+        if step["started_at"] is not None:
+            elapsed = round((step["finished_at"] or now) - step["started_at"], 1)
+        rows.append({
+            "STEP": step["name"],
+            "DEPENDS_ON": ", ".join(step["depends_on"]),
+            "STATUS": step["status"],
+            "ELAPSED_SECONDS": elapsed,
+            "ERROR": step["error"],
+        })
+    return pd.DataFrame(rows, columns=["STEP", "DEPENDS_ON", "STATUS", "ELAPSED_SECONDS", "ERROR"])
+
+@st.fragment(run_every=PIPELINE_POLL_INTERVAL_SECONDS)
+def _pipeline_job_status(job):
+    """Redraw a running job's step table every poll interval; rerun the page once its worker finishes."""
+    if job["status"] != "RUNNING":
+        st.rerun()
+    st.dataframe(pipeline_job_dataframe(job), use_container_width=True)
+
+def render_pipeline_job(job, title, rerun_hint, derived_database):
+    """Show a job's live step table and outcome; refresh cached metadata for its output once."""
+    st.subheader(title)
+    st.caption(f"Job {job['job_id']} started at "
+               f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(job['started_at']))}")
+    if job["resumed_from"]:
+        st.caption(f"Resumed from job {job['resumed_from']}; REUSED steps were not run again.")
+    # A running job is polled by a fragment, so the rest of the page keeps rendering meanwhile
+    if job["status"] == "RUNNING":
+        _pipeline_job_status(job)
+        return
+    st.dataframe(pipeline_job_dataframe(job), use_container_width=True)
+    if job["status"] == "SUCCESS":
+        st.success("✅ Completed all processes successfully!")
+    elif job["status"] == "INTERRUPTED":
+        st.warning(f"This run was interrupted before it finished. Please {rerun_hint} again.")
+    else:
+        st.warning("Some steps failed. Please review the errors.")
+    if not job["reported"]:
+        job["reported"] = True
+        refresh_metadata(derived_database)
+
+# Pipeline definitions for Run Masking and Run Encryption. Each step names the steps it
+# depends on; the background job runs independent steps in parallel.
+def _classification_steps(environment, classification_database, classification_schema, classification_owner):
+    """Steps that load classifications for a schema; returns (steps, name of the final step)."""
+    if classification_owner == "ALTR":
+        steps = [
+            {
+                "name": "ALTR MAPPER",
+                "depends_on": [],
+                "sql": sql_statement("altr_tag_mapper"),
+                "params": [
+                    manager_database(environment),
+                    f"{classification_database} DATABASE CLASSIFICATION",
+                    classification_database,
+                ],
+            },
+            {
+                "name": "ALTR CLASSIFICATION DETAILS",
+                "depends_on": ["ALTR MAPPER"],
+                "sql": sql_statement("altr_classification_details"),
+                "params": [classification_database, classification_schema],
+            },
+        ]
+        return steps, "ALTR CLASSIFICATION DETAILS"
+
+    # Transfer classifications when the classification owner is NOT ALTR
+    steps = [
+        {
+            "name": "TRANSFER CLASSIFICATION DETAILS",
+            "depends_on": [],
+            "sql": sql_statement("transfer_classification_details"),
+            "params": [classification_database, classification_schema, classification_owner],
+        },
+    ]
+    return steps, "TRANSFER CLASSIFICATION DETAILS"
+
+def build_masking_pipeline(environment, masking_database, masking_schema, classification_database,
+                           classification_schema, classification_owner, bu_name):
+    steps, classification_step = _classification_steps(
+        environment, classification_database, classification_schema, classification_owner
+    )
+    manager = manager_database(environment)
+    steps += [
+        {
+            # Metadata refresh reads INFORMATION_SCHEMA only, so it runs alongside the classification load
+            "name": "Metadata Refresh",
+            "depends_on": [],
+            "sql": sql_statement("metadata_refresh", manager_database=manager),
+            "params": [masking_database],
+        },
+        {
+            "name": "COLUMN TAG MAPPING",
+            "depends_on": [classification_step, "Metadata Refresh"],
+            "sql": sql_statement("column_tag_mapping", manager_database=manager),
+            "params": [classification_database, classification_schema, masking_database, masking_schema, classification_owner],
+        },
+        {
+            "name": "INSERT DATA OUTPUT FINAL",
+            "depends_on": ["COLUMN TAG MAPPING"],
+            "sql": sql_statement("insert_data_output_final", manager_database=manager),
+            "params": [masking_database, masking_schema, bu_name, classification_owner],
+        },
+        {
+            "name": "CLASSIFICATION_GENERATION",
+            "depends_on": ["INSERT DATA OUTPUT FINAL"],
+            "sql": sql_statement("classification_report"),
+            "params": [classification_database, classification_schema, classification_owner],
+        },
+        {
+            "name": "CREATE VIEWS",
+            "depends_on": ["INSERT DATA OUTPUT FINAL"],
+            "sql": sql_statement("create_views", manager_database=manager),
+            "params": [masking_database, masking_schema, f"{masking_database}_MASKED", masking_schema],
+        },
+    ]
+    return steps
+
+def build_encryption_pipeline(environment, encryption_database, encryption_schema, classification_database,
+                              classification_schema, classification_owner, bu_name):
+    steps, classification_step = _classification_steps(
+        environment, classification_database, classification_schema, classification_owner
+    )
+    manager = manager_database(environment)
+    steps += [
+        {
+            "name": "INSERT DATA OUTPUT FINAL",
+            "depends_on": [classification_step],
+            "sql": sql_statement("insert_data_output_final_encryption", manager_database=manager),
+            "params": [encryption_database, encryption_schema, bu_name, classification_owner],
+        },
+        {
+            "name": "CLASSIFICATION_GENERATION",
+            "depends_on": ["INSERT DATA OUTPUT FINAL"],
+            "sql": sql_statement("classification_report"),
+            "params": [classification_database, classification_schema, classification_owner],
+        },
+        {
+            "name": "CREATE TABLES",
+            "depends_on": ["INSERT DATA OUTPUT FINAL"],
+            "sql": sql_statement("encrypt_tables", manager_database=manager),
+            "params": [encryption_database, encryption_schema, f"{encryption_database}_ENCRYPT", encryption_schema],
+        },
+    ]
+    return steps
+
+# Database-level steps that a batch run executes once and shares across all of its schemas
+PIPELINE_SHARED_STEPS = ("ALTR MAPPER", "Metadata Refresh")
+
+def build_batch_pipeline(schema_pipelines):
+    """Merge {schema: steps} into one DAG. Shared database-level steps are kept once; the
+    per-schema steps are prefixed with the schema name and fan out after them."""
+    shared_steps = {}
+    schema_steps = []
+    for schema, steps in schema_pipelines.items():
+        for step in steps:
+            if step["name"] in PIPELINE_SHARED_STEPS:
+                shared_steps.setdefault(step["name"], step)
+                continue
+            schema_steps.append({
+                "name": f"{schema}: {step['name']}",
+                "sql": step["sql"],
+                "params": step.get("params", []),
+                "depends_on": [
+                    name if name in PIPELINE_SHARED_STEPS else f"{schema}: {name}"
+                    for name in step["depends_on"]
+                ],
+            })
+    return [shared_steps[name] for name in PIPELINE_SHARED_STEPS if name in shared_steps] + schema_steps
+
+# Owner of the latest classification import per (database, schema), loaded for every schema
+# with one grouped query and shared by all sessions. Submissions and pipeline runs write new
+# imports and invalidate it; the TTL covers imports written outside the app.
+@st.cache_resource
+def _classification_owner_index():
+    """Process-wide classification owner index; pipeline worker threads invalidate it as well."""
+    return {"owners": None, "loaded_at": 0.0, "lock": threading.Lock()}
+
+def invalidate_classification_owners():
+    """Drop the owner index so the next lookup reloads it."""
+    index = _classification_owner_index()
+    with index["lock"]:
+        index["owners"] = None
+
+def get_latest_classification_owners(classification_database):
+    """Owner of the latest classification import for every schema of a database."""
+    index = _classification_owner_index()
+    # Loading under the lock lets concurrent reruns share one query instead of each running it
+    with index["lock"]:
+        if index["owners"] is None or time.time() - index["loaded_at"] >= METADATA_CACHE_TTL_SECONDS:
+            df = fetch_dataframe(sql_statement("classification_owner_index"), "Classification owner index")
+            owners = {}
+            for database_name, schema_name, classification_owner in zip(
+                _column_values(df.iloc[:, 0]), _column_values(df.iloc[:, 1]), _column_values(df.iloc[:, 2])
+            ):
+                owners.setdefault(database_name, {})[schema_name] = classification_owner
+            index["owners"] = owners
+            index["loaded_at"] = time.time()
+        return dict(index["owners"].get(classification_database, {}))
+
+def render_batch_pipeline(pipeline, label, environment, database, classification_database, bu_name,
+                          build_schema_pipeline, audit_type, derived_database):
+    """Batch mode for a pipeline page: run many schemas, or a whole database, as one background job."""
+    with st.expander(f"Batch {label} (multiple schemas or entire database)"):
+        available_schemas = [schema for schema in get_schemas(database) if schema != "INFORMATION_SCHEMA"]
+        whole_database = st.checkbox("All schemas in database", key=f"batch_all_{pipeline}")
+        if whole_database:
+            batch_schemas = available_schemas
+            st.caption(f"{len(batch_schemas)} schemas selected.")
+        else:
+            batch_schemas = st.multiselect("Schemas", available_schemas, key=f"batch_schemas_{pipeline}")
+        max_parallel_steps = st.number_input(
+            "Max Parallel Steps", min_value=1, max_value=16, value=PIPELINE_MAX_PARALLEL_STEPS,
+            key=f"batch_parallel_{pipeline}",
+        )
+        resume_batch = st.checkbox("Resume from failed step", key=f"batch_resume_{pipeline}")
+        batch_run_key = f"{environment}|{database}|BATCH"
+
+        if st.button(f"Run Batch {label}", key=f"batch_run_{pipeline}"):
+            if not (database and bu_name and batch_schemas):
+                st.warning("Please select a database, BU name and at least one schema.")
+            else:
+                existing_job = find_pipeline_job(pipeline, batch_run_key)
+                if existing_job is not None and existing_job["status"] == "RUNNING":
+                    st.warning(f"A batch {label.lower()} run for this database is already in progress.")
+                else:
+                    try:
+                        owners = get_latest_classification_owners(classification_database)
+                    except Exception as e:
+                        st.warning(f"Could not fetch classification owners: {e}")
+                        owners = {}
+                    # Schemas without a classification import fall back to "ALTR", as in single-schema mode
+                    batch_steps = build_batch_pipeline({
+                        schema: build_schema_pipeline(schema, owners.get(schema, "ALTR"))
+                        for schema in batch_schemas
+                    })
+                    resume_from = None
+                    if resume_batch and existing_job is not None and existing_job["status"] in ("FAILED", "INTERRUPTED"):
+                        resume_from = existing_job
+                    start_pipeline_job(
+                        pipeline,
+                        batch_run_key,
+                        batch_steps,
+                        audit_message=f"{pipeline} for {derived_database} ({len(batch_schemas)} schemas)",
+                        audit_type=audit_type,
+                        resume_from=resume_from,
+                        max_parallel_steps=max_parallel_steps,
+                    )
+
+        if database:
+            batch_job = find_pipeline_job(pipeline, batch_run_key)
+            if batch_job is not None:
+                render_pipeline_job(batch_job, f"Batch {label} Job Status", f"run batch {label.lower()}", derived_database)
 
 # Main app title
 st.sidebar.title("ZDC APP")
@@ -205,6 +1457,17 @@ app_mode = st.sidebar.radio("Select a function:",
                               "Snowflake Encryption",                              
                               "Classifications"])
 
+# Metadata catalog controls
+with st.sidebar.expander("Metadata Cache"):
+    metadata_catalog = _metadata_catalog()
+    st.caption(
+        f"Hits: {metadata_catalog['hits']} | Misses: {metadata_catalog['misses']} | "
+        f"Entries: {len(metadata_catalog['entries'])}"
+    )
+    if st.button("🔄 Refresh Metadata"):
+        refresh_metadata()
+        st.success("Metadata cache cleared.")
+
 # Home Page for the Data Governance App
 if app_mode == "Home":
     st.markdown('<h1 class="font">WELCOME TO THE ZDC APP</h1>', unsafe_allow_html=True)
@@ -246,86 +1509,189 @@ elif app_mode == "Synthetic Data Generation":
         st.markdown('<h1 class="font">Synthetic Data Generation</h1>', unsafe_allow_html=True)
         session = get_active_session()
 
-        # Functions to fetch databases, schemas, and tables
-        def get_databases(env_prefix=None):
-            if env_prefix:
-                db_query = f"""
-                SELECT DATABASE_NAME 
-                FROM INFORMATION_SCHEMA.DATABASES 
-                WHERE DATABASE_NAME LIKE '{env_prefix}%' AND DATABASE_NAME NOT LIKE '%_MASKED%' AND DATABASE_NAME NOT LIKE '%_ENCRYPT%'
-                """
-            else:
-                db_query = """
-                SELECT DATABASE_NAME 
-                FROM INFORMATION_SCHEMA.DATABASES
-                """
-            rows = session.sql(db_query).collect()
-            return [row[0] for row in rows]
-
-        def get_schemas(database):
-            schema_query = f"SELECT SCHEMA_NAME FROM {database}.INFORMATION_SCHEMA.SCHEMATA"
-            rows = session.sql(schema_query).collect()
-            return [row[0] for row in rows]
-
-        def get_tables_for_schema(database, schema):
-            table_query = f"""
-            SELECT TABLE_NAME 
-            FROM {database}.INFORMATION_SCHEMA.TABLES 
-            WHERE TABLE_SCHEMA = '{schema}' AND TABLE_TYPE = 'BASE TABLE'
-            """
-            rows = session.sql(table_query).collect()
-            return [row[0] for row in rows]
-
-        def get_columns_for_table(database, schema, table):
-            columns_query = f"""
-            SELECT COLUMN_NAME 
-            FROM {database}.INFORMATION_SCHEMA.COLUMNS 
-            WHERE TABLE_SCHEMA = '{schema}' AND TABLE_NAME = '{table}'
-            """
-            rows = session.sql(columns_query).collect()
-            return [row[0] for row in rows]
-
-        # Function to check if a table has sufficient non-null values
-        def has_valid_data(database, schema, table):
+        # Limits documented for SNOWFLAKE.DATA_PRIVACY.GENERATE_SYNTHETIC_DATA input tables
+        SYNTHETIC_MIN_DISTINCT_ROWS = 20
+        SYNTHETIC_MAX_COLUMNS = 100
+        SYNTHETIC_MAX_ROWS = 14000000
+        SUFFICIENCY_SCAN_BATCH_SIZE = 50
+        # Rows read per table when counting distinct rows; DISTINCT runs on this slice, not the whole table.
+        # Tables that fall short on the slice are re-probed over the whole table before being rejected
+        SUFFICIENCY_DISTINCT_PROBE_ROWS = 1000
+
+        # Function to check every table of a schema against the synthetic data requirements in one pass
+        def check_data_sufficiency(database, schema, tables):
+            """Return a per-table verdict DataFrame, scanning only tables that pass the metadata checks."""
+            schema_columns = get_schema_columns(database, schema)
+            row_counts = {}
             try:
-                column_query = f"""
-                SELECT COLUMN_NAME 
-                FROM {database}.INFORMATION_SCHEMA.COLUMNS 
-                WHERE TABLE_SCHEMA = '{schema}' AND TABLE_NAME = '{table}' 
-                ORDER BY ORDINAL_POSITION LIMIT 1
-                """
-                columns = session.sql(column_query).collect()
+                row_counts = fetch_mapping(
+                    sql_statement("row_counts", database=database), f"Row counts in {database}.{schema}", [schema]
+                )
+            except Exception as e:
+                st.warning(f"Could not read row counts for {database}.{schema}: {e}")
+
+            verdicts = {}
+            tables_to_scan = []
+            for table in tables:
+                columns = schema_columns.get(table, [])
+                row_count = row_counts.get(table)
+                verdict = {
+                    "TABLE_NAME": table,
+                    "ROW_COUNT": row_count,
+                    "COLUMN_COUNT": len(columns),
+                    "DISTINCT_ROWS": None,
+                    "VALID": False,
+                    "REASON": "",
+                }
+                verdicts[table] = verdict
 
                 if not columns:
-                    return False
-                
-                first_column = columns[0][0]
+                    verdict["REASON"] = "No columns found"
+                elif len(columns) > SYNTHETIC_MAX_COLUMNS:
+                    verdict["REASON"] = f"More than {SYNTHETIC_MAX_COLUMNS} columns"
+                elif row_count is not None and row_count > SYNTHETIC_MAX_ROWS:
+                    verdict["REASON"] = f"More than {SYNTHETIC_MAX_ROWS:,} rows"
+                elif row_count is not None and row_count < SYNTHETIC_MIN_DISTINCT_ROWS:
+                    verdict["REASON"] = f"Fewer than {SYNTHETIC_MIN_DISTINCT_ROWS} rows"
+                else:
+                    tables_to_scan.append(table)
+
+            # Scan the remaining tables in UNION ALL batches; every probe is bounded by a LIMIT.
+            # Only quoted identifiers and code constants are spliced in; values are bound
+            non_null_rows = {}
+            for start in range(0, len(tables_to_scan), SUFFICIENCY_SCAN_BATCH_SIZE):
+                batch = tables_to_scan[start:start + SUFFICIENCY_SCAN_BATCH_SIZE]
+                probes = []
+                params = []
+                for table in batch:
+                    table_ref = quote_identifier(database, schema, table)
+                    first_column = quote_identifier(schema_columns[table][0]["name"])
+                    params.append(table)
+                    if verdicts[table]["ROW_COUNT"] is None:
+                        row_count_expr = f"(SELECT COUNT(*) FROM (SELECT 1 FROM {table_ref} LIMIT {SYNTHETIC_MAX_ROWS + 1}))"
+                    else:
+                        row_count_expr = "?"
+                        params.append(verdicts[table]["ROW_COUNT"])
+                    probes.append(f"""
+                    SELECT
+                        ? AS TABLE_NAME,
+                        {row_count_expr} AS ROW_COUNT,
+                        (SELECT COUNT(*) FROM (
+                            SELECT DISTINCT * FROM (SELECT * FROM {table_ref} LIMIT {SUFFICIENCY_DISTINCT_PROBE_ROWS})
+                            LIMIT {SYNTHETIC_MIN_DISTINCT_ROWS}
+                        )) AS DISTINCT_ROWS,
+                        (SELECT COUNT(*) FROM (SELECT 1 FROM {table_ref} WHERE {first_column} IS NOT NULL LIMIT 2)) AS NON_NULL_ROWS
+                    """)
+                try:
+                    rows = execute_sql(
+                        "\n UNION ALL \n".join(probes),
+                        f"Sufficiency check, tables {start + 1}-{start + len(batch)}",
+                        params=params,
+                    )
+                except Exception as e:
+                    for table in batch:
+                        verdicts[table]["REASON"] = f"Check failed: {e}"
+                    continue
 
-                check_query = f"""
-                SELECT COUNT(*) 
-                FROM {database}.{schema}.{table} 
-                WHERE {first_column} IS NOT NULL
-                """
-                result = session.sql(check_query).collect()
-                return result[0][0] > 1  
+                for row in rows:
+                    verdict = verdicts[row["TABLE_NAME"]]
+                    verdict["ROW_COUNT"] = row["ROW_COUNT"]
+                    verdict["DISTINCT_ROWS"] = row["DISTINCT_ROWS"]
+                    non_null_rows[row["TABLE_NAME"]] = row["NON_NULL_ROWS"]
+
+            # The slice only proves there are enough distinct rows; re-count the tables that fell
+            # short and hold more rows than the slice over the whole table (still stopping at the minimum)
+            reprobe_tables = [
+                table for table in non_null_rows
+                if verdicts[table]["DISTINCT_ROWS"] < SYNTHETIC_MIN_DISTINCT_ROWS
+                and verdicts[table]["ROW_COUNT"] > SUFFICIENCY_DISTINCT_PROBE_ROWS
+            ]
+            for start in range(0, len(reprobe_tables), SUFFICIENCY_SCAN_BATCH_SIZE):
+                batch = reprobe_tables[start:start + SUFFICIENCY_SCAN_BATCH_SIZE]
+                probes = [
+                    f"""
+                    SELECT
+                        ? AS TABLE_NAME,
+                        (SELECT COUNT(*) FROM (
+                            SELECT DISTINCT * FROM {quote_identifier(database, schema, table)}
+                            LIMIT {SYNTHETIC_MIN_DISTINCT_ROWS}
+                        )) AS DISTINCT_ROWS
+                    """
+                    for table in batch
+                ]
+                try:
+                    rows = execute_sql(
+                        "\n UNION ALL \n".join(probes),
+                        f"Sufficiency re-check, tables {start + 1}-{start + len(batch)}",
+                        params=batch,
+                    )
+                except Exception as e:
+                    for table in batch:
+                        verdicts[table]["REASON"] = f"Check failed: {e}"
+                        del non_null_rows[table]
+                    continue
+                for row in rows:
+                    verdicts[row["TABLE_NAME"]]["DISTINCT_ROWS"] = row["DISTINCT_ROWS"]
+
+            for table, non_null in non_null_rows.items():
+                verdict = verdicts[table]
+                if verdict["ROW_COUNT"] > SYNTHETIC_MAX_ROWS:
+                    verdict["REASON"] = f"More than {SYNTHETIC_MAX_ROWS:,} rows"
+                elif verdict["DISTINCT_ROWS"] < SYNTHETIC_MIN_DISTINCT_ROWS:
+                    verdict["REASON"] = f"Fewer than {SYNTHETIC_MIN_DISTINCT_ROWS} distinct rows"
+                elif non_null <= 1:
+                    verdict["REASON"] = "First column has no valid data"
+                else:
+                    verdict["VALID"] = True
 
-            except Exception as e:
-                st.error(f"Error checking valid data for {database}.{schema}.{table}: {e}")
-                return False
+            return pd.DataFrame(
+                [verdicts[table] for table in tables],
+                columns=["TABLE_NAME", "ROW_COUNT", "COLUMN_COUNT", "DISTINCT_ROWS", "VALID", "REASON"],
+            )
+
+        # GENERATE_SYNTHETIC_DATA accepts at most five input tables per call
+        SYNTHETIC_MAX_DATASETS_PER_CALL = 5
+
+        # Function to pack tables into as few GENERATE_SYNTHETIC_DATA calls as the procedure allows
+        def build_synthetic_data_calls(source_database, source_schema, target_database, target_schema,
+                                       tables, join_keys, output_table_names=None):
+            """Return [{"tables": [...], "sql": "CALL ...", "params": [config]}] with every join key of a table in one columns map."""
+            output_table_names = output_table_names or {}
+            # Tables with join keys go first so related tables share a call and keep referential integrity
+            ordered_tables = sorted(tables, key=lambda table: not join_keys.get(table))
+
+            calls = []
+            for start in range(0, len(ordered_tables), SYNTHETIC_MAX_DATASETS_PER_CALL):
+                chunk = ordered_tables[start:start + SYNTHETIC_MAX_DATASETS_PER_CALL]
+                datasets = []
+                for table in chunk:
+                    output_table = output_table_names.get(table, table)
+                    dataset = {
+                        "input_table": quote_identifier(source_database, source_schema, table),
+                        "output_table": quote_identifier(target_database, target_schema, output_table),
+                    }
+                    keys = join_keys.get(table) or []
+                    if keys:
+                        dataset["columns"] = {key: {"join_key": True} for key in keys}
+                    datasets.append(dataset)
+
+                # The config travels as one bound JSON value instead of a literal spliced into the CALL
+                config = {"datasets": datasets, "replace_output_tables": True}
+                calls.append({
+                    "tables": chunk,
+                    "sql": sql_statement("generate_synthetic_data"),
+                    "params": [json.dumps(config)],
+                })
+            return calls
 
         # Environment dropdown selection
-        env = st.selectbox("Environment", ["DEV", "QA", "UAT", "PROD"])
+        env = st.selectbox("Environment", ENVIRONMENTS)
 
         # Get list of source databases based on selected environment
         database_list_source = get_databases(env)
 
-        # Get all databases for target
-        database_list_target = (
-            get_databases("DEV") +
-            get_databases("QA") +
-            get_databases("UAT") +
-            get_databases("PROD")
-        )
+        # Get all databases for target, served from the same database index
+        database_list_target = [db for target_env in ENVIRONMENTS for db in get_databases(target_env)]
 
         # Organize inputs for source selection in columns
         col1, col2, col3 = st.columns(3)
@@ -359,7 +1725,7 @@ elif app_mode == "Synthetic Data Generation":
                     if table not in st.session_state.join_keys:
                         st.session_state.join_keys[table] = []
 
-                    # Get column options
+                    # Get column options from the schema-level column prefetch
                     columns = get_columns_for_table(selected_source_database, selected_source_schema, table)
 
                     # Check to ensure default join keys are part of available column options
@@ -395,6 +1761,36 @@ elif app_mode == "Synthetic Data Generation":
         # Automatically set to the first selected table name if left blank
         default_output_table_names = {table: table for table in selected_tables}  # Store default names for each selected table
 
+        # Number of GENERATE_SYNTHETIC_DATA calls allowed to run on the warehouse at the same time
+        max_concurrent_generations = st.number_input(
+            "Max Concurrent Generations", min_value=1, max_value=16, value=DEFAULT_MAX_CONCURRENT_QUERIES
+        )
+
+        # Function to submit synthetic generation calls as one async run
+        def start_synthetic_run(synthetic_calls, scope, success_message):
+            run = start_async_queries(
+                "synthetic",
+                [{"name": ", ".join(call["tables"]), "sql": call["sql"], "params": call["params"]} for call in synthetic_calls],
+                max_concurrency=max_concurrent_generations,
+            )
+            run["scope"] = scope
+            run["success_message"] = success_message
+            run["target_database"] = selected_target_database
+            return run
+
+        # Function to report a finished synthetic run exactly once
+        def report_synthetic_run(run):
+            run["reported"] = True
+            refresh_metadata(run["target_database"])
+            failed_jobs = [job["name"] for job in run["jobs"] if job["status"] == "FAILED"]
+            if failed_jobs:
+                st.error(f"❌ Synthetic data generation failed for: {'; '.join(failed_jobs)}", icon="🚨")
+                log_audit(f"Synthetic Data Generation for {run['scope']} encountered an error.", "FAILED", "synthetic")
+            else:
+                elapsed = run["finished_at"] - run["started_at"]
+                st.success(f"{run['success_message']} ({elapsed:.1f}s)", icon="✅")
+                log_audit(f"Synthetic Data Generation for {run['scope']} completed successfully.", "SUCCESS", "synthetic")
+
         # Buttons for generating synthetic data
         col1, col2 = st.columns(2)
 
@@ -402,56 +1798,23 @@ elif app_mode == "Synthetic Data Generation":
             if st.button("Generate Synthetic Data for Schema"):
                 # Generate synthetic data for the entire schema
                 try:
-                    tables_with_invalid_data = []
-                    for table in source_table_list:
-                        if not has_valid_data(selected_source_database, selected_source_schema, table):
-                            tables_with_invalid_data.append(table)
+                    sufficiency = check_data_sufficiency(selected_source_database, selected_source_schema, source_table_list)
+                    tables_with_invalid_data = sufficiency.loc[~sufficiency["VALID"], "TABLE_NAME"].tolist()
 
                     if tables_with_invalid_data:
                         st.warning(
                             f"⚠️ The following tables do not contain sufficient valid data: {', '.join(tables_with_invalid_data)}"
                         )
+                        st.dataframe(sufficiency, use_container_width=True)
                         log_audit("Synthetic Data Generation failed due to insufficient data.", "FAILED", "synthetic")
                     else:
-                        # Generate synthetic data for each selected table
-                        for table in selected_tables:
-                            join_keys = st.session_state.join_keys[table]
-                            
-                            if join_keys:  # Check Join Keys list is not empty
-                                for join_key in join_keys:
-                                    sql_command = f"""
-                                    CALL SNOWFLAKE.DATA_PRIVACY.GENERATE_SYNTHETIC_DATA(
-                                        {{
-                                            'datasets': [
-                                                {{
-                                                    'input_table': '{selected_source_database}.{selected_source_schema}.{table}',
-                                                    'output_table': '{selected_target_database}.{selected_target_schema}.{table}',
-                                                    'columns': {{ '{join_key}':{{'join_key': True}} }}
-                                                }}
-                                            ],
-                                            'replace_output_tables': true
-                                        }}
-                                    );
-                                    """
-                                    session.sql(sql_command).collect()
-                            else:
-                                sql_command = f"""
-                                CALL SNOWFLAKE.DATA_PRIVACY.GENERATE_SYNTHETIC_DATA(
-                                    {{
-                                        'datasets': [
-                                            {{
-                                                'input_table': '{selected_source_database}.{selected_source_schema}.{table}',
-                                                'output_table': '{selected_target_database}.{selected_target_schema}.{table}'
-                                            }}
-                                        ],
-                                        'replace_output_tables': true
-                                    }}
-                                );
-                                """
-                                session.sql(sql_command).collect()
-                        
-                        st.success("✅ Synthetic data has been successfully generated for selected tables!", icon="✅")
-                        log_audit("Synthetic Data Generation for schema completed successfully.", "SUCCESS", "synthetic")
+                        # Generate synthetic data for the selected tables, several tables per call
+                        synthetic_calls = build_synthetic_data_calls(
+                            selected_source_database, selected_source_schema,
+                            selected_target_database, selected_target_schema,
+                            selected_tables, st.session_state.join_keys,
+                        )
+                        start_synthetic_run(synthetic_calls, "schema", "✅ Synthetic data has been successfully generated for selected tables!")
 
                 except Exception as e:
                     st.error(f"❌ Error executing SQL command: {e}", icon="🚨")
@@ -462,51 +1825,26 @@ elif app_mode == "Synthetic Data Generation":
                 # Generate synthetic data for the selected tables
                 if selected_tables and selected_target_schema:
                     try:
-                        for table in selected_tables:
-                            output_table_name = default_output_table_names.get(table, table)
-                            join_keys = st.session_state.join_keys[table]
-
-                            if join_keys:  # Check Join Keys list is not empty
-                                for join_key in join_keys:
-                                    sql_command = f"""
-                                    CALL SNOWFLAKE.DATA_PRIVACY.GENERATE_SYNTHETIC_DATA(
-                                        {{
-                                            'datasets': [
-                                                {{
-                                                    'input_table': '{selected_source_database}.{selected_source_schema}.{table}',
-                                                    'output_table': '{selected_target_database}.{selected_target_schema}.{output_table_name}',
-                                                    'columns': {{ '{join_key}':{{'join_key': True}} }}
-                                                }}
-                                            ],
-                                            'replace_output_tables': true
-                                        }}
-                                    );
-                                    """
-                                    session.sql(sql_command).collect()
-                            else:
-                                sql_command = f"""
-                                CALL SNOWFLAKE.DATA_PRIVACY.GENERATE_SYNTHETIC_DATA(
-                                    {{
-                                        'datasets': [
-                                            {{
-                                                'input_table': '{selected_source_database}.{selected_source_schema}.{table}',
-                                                'output_table': '{selected_target_database}.{selected_target_schema}.{output_table_name}'
-                                            }}
-                                        ],
-                                        'replace_output_tables': true
-                                    }}
-                                );
-                                """
-                                session.sql(sql_command).collect()
-                        
-                        st.success("✅ Synthetic data has been successfully generated for the selected tables!", icon="✅")
-                        log_audit("Synthetic Data Generation for selected tables completed successfully.", "SUCCESS", "synthetic")
+                        synthetic_calls = build_synthetic_data_calls(
+                            selected_source_database, selected_source_schema,
+                            selected_target_database, selected_target_schema,
+                            selected_tables, st.session_state.join_keys,
+                            output_table_names=default_output_table_names,
+                        )
+                        start_synthetic_run(synthetic_calls, "selected tables", "✅ Synthetic data has been successfully generated for the selected tables!")
                     except Exception as e:
                         st.error(f"❌ Error executing SQL command: {e}", icon="🚨")
                         log_audit("Synthetic Data Generation for selected tables encountered an error.", "FAILED", "synthetic")
                 else:
                     st.error("❌ Please select at least one source table and a target schema.", icon="🚨")
 
+        # Live per-table status of the latest synthetic run; it is re-checked on a timer, not waited on
+        synthetic_run = get_async_run("synthetic")
+        if synthetic_run is not None:
+            st.subheader("Synthetic Generation Jobs")
+            if render_async_run(synthetic_run) and not synthetic_run["reported"]:
+                report_synthetic_run(synthetic_run)
+
 import streamlit as st
 import pandas as pd
 from snowflake.snowpark.context import get_active_session
@@ -556,38 +1894,16 @@ if app_mode == "Snowflake Masking":
 
     # Perform selections for Masking
     elif app_mode_masking == "MASKING":
-        # Function to get databases based on prefix
-        def get_databases(env):
-            db_prefix = f"{env}_"
-            db_query = f"""
-            SELECT DATABASE_NAME
-            FROM INFORMATION_SCHEMA.DATABASES
-            WHERE DATABASE_NAME LIKE '{db_prefix}%'
-            AND DATABASE_NAME NOT LIKE '%_MASKED%' AND DATABASE_NAME NOT LIKE '%_ENCRYPT%'
-            """
-            rows = session.sql(db_query).collect()
-            return [row[0] for row in rows]
-
-        # Function to fetch schemas for a specific database
-        def get_schemas(database_name):
-            if not database_name:
-                return []
-            schema_query = f"SELECT SCHEMA_NAME FROM {database_name}.INFORMATION_SCHEMA.SCHEMATA"
-            rows = session.sql(schema_query).collect()
-            return [row[0] for row in rows]
-
         # Function to fetch distinct BU names based on environment
         def get_bu_names(env):
-            bu_query = f"SELECT DISTINCT BU_NAME FROM {env}_DB_MANAGER.MASKING.CONSUMER"
             try:
-                rows = session.sql(bu_query).collect()
-                return [row[0] for row in rows]
+                return fetch_column(sql_statement("bu_names", manager_database=manager_database(env)), f"BU names in {env}")
             except Exception as e:
                 st.warning(f"Could not fetch BU names for environment {env}: {e}")
                 return []
 
         # Input selections for masking environment
-        masking_environment = st.selectbox("Masking Environment", ["DEV", "QA", "UAT", "PROD"])
+        masking_environment = st.selectbox("Masking Environment", ENVIRONMENTS)
 
         # Get databases based on the selected environment
         masking_database_list = get_databases(masking_environment)
@@ -613,405 +1929,489 @@ if app_mode == "Snowflake Masking":
         bu_name_list = get_bu_names(masking_environment)
         selected_bu_name = st.selectbox("BU Name", bu_name_list)
 
-        # Get classification owner based on the new query criteria
-        classification_owner_list = []
+        # Get classification owner from the shared owner index
+        classification_owners = {}
         if selected_classification_database and selected_classification_schema:
-            owner_query = f"""
-            WITH latest_import AS (
-              SELECT MAX(import_id) AS max_id
-              FROM DEV_DB_MANAGER.MASKING.RAW_CLASSIFICATION_DETAILS
-              WHERE database_name = '{selected_classification_database}'
-              AND schema_name = '{selected_classification_schema}'
-            )
-            SELECT DISTINCT classification_owner
-            FROM DEV_DB_MANAGER.MASKING.RAW_CLASSIFICATION_DETAILS
-            WHERE database_name = '{selected_classification_database}'
-              AND schema_name = '{selected_classification_schema}'
-              AND import_id = (SELECT max_id FROM latest_import);
-            """
             try:
-                rows = session.sql(owner_query).collect()
-                classification_owner_list = [row[0] for row in rows]
+                classification_owners = get_latest_classification_owners(selected_classification_database)
             except Exception as e:
                 st.warning(f"Could not fetch classification owner: {e}")
-                classification_owner_list = []
+                classification_owners = {}
 
-        # Use classification owner from query results or fallback to "ALTR"
-        selected_classification_owner = classification_owner_list[0] if classification_owner_list else "ALTR"
+        # Use classification owner from the owner index or fallback to "ALTR"
+        selected_classification_owner = classification_owners.get(selected_classification_schema, "ALTR")
 
-        # Button to execute all the masking processes
+        # Key identifying one masking target; the latest job for it is shown across reruns
+        masking_run_key = f"{masking_environment}|{selected_masking_database}|{selected_masking_schema}|{selected_classification_owner}"
+
+        # Button to start the masking pipeline as a background job
+        resume_masking = st.checkbox(
+            "Resume from failed step",
+            key="resume_masking",
+            help="Skip steps that already succeeded with unchanged inputs in the last run for this schema.",
+        )
         if st.button("Run Masking"):
             if (selected_masking_database and selected_masking_schema and
                 selected_bu_name and selected_classification_database and selected_classification_schema):
 
-                # Track success of all operations
-                success = True
-
-                # Execute each process in sequence
-                if selected_classification_owner == "ALTR":
-                    try:
-                        # Execute ALTR MAPPER
-                        sql_command = f"""
-                        CALL ALTR_DSAAS_DB.PUBLIC.ALTR_TAG_MAPPER(
-                            MAPPING_FILE_PATH => BUILD_SCOPED_FILE_URL(@ALTR_DSAAS_DB.PUBLIC.ALTR_TAG_MAPPER_STAGE, 'gdlp-to-hipaa-map.json'),
-                            TAG_DB => '{masking_environment}_DB_MANAGER',
-                            TAG_SCHEMA => 'MASKING',
-                            RUN_COMMENT => '{selected_classification_database} DATABASE CLASSIFICATION',
-                            USE_DATABASES => '{selected_classification_database}',
-                            EXECUTE_SQL => FALSE,
-                            LOG_TABLE => 'CLASSIFICATION_DETAILS'
-                        );
-                        """
-                        session.sql(sql_command).collect()
-                        st.success("✅ ALTR MAPPER executed successfully!")
-                    except Exception as e:
-                        st.error(f"❌ Error executing ALTR MAPPER: {str(e)}")
-                        success = False
-
-                    if success:
-                        try:
-                            # Execute ALTR CLASSIFICATION DETAILS
-                            sql_command = f"CALL DEV_DB_MANAGER.MASKING.ALTR_CLASSIFICATION_DETAILS('{selected_classification_database}', '{selected_classification_schema}')"
-                            session.sql(sql_command).collect()
-                            st.success("✅ ALTR CLASSIFICATION DETAILS executed successfully!")
-                        except Exception as e:
-                            st.error(f"❌ Error executing ALTR CLASSIFICATION DETAILS: {str(e)}")
-                            success = False
-
-                # Section for handling transfers when classification owner is NOT ALTR
-                if selected_classification_owner != "ALTR":
-                    try:
-                        # Execute TRANSFER CLASSIFICATION DETAILS
-                        sql_command = f"CALL DEV_DB_MANAGER.MASKING.TRANSFER_CLASSIFICATION_DETAILS('{selected_classification_database}', '{selected_classification_schema}', '{selected_classification_owner}')"
-                        session.sql(sql_command).collect()
-                        st.success("✅ TRANSFER CLASSIFICATION DETAILS executed successfully!")
-                    except Exception as e:
-                        st.error(f"❌ Error executing TRANSFER CLASSIFICATION DETAILS: {str(e)}")
-                        success = False
-
-                # Metadata Refresh
-                if success:
-                    try:
-                        # Execute Metadata Refresh
-                        db_manager = f"{masking_environment}_DB_MANAGER"
-                        # Pass the selected masking database to the procedure
-                        sql_command = f"CALL {db_manager}.MASKING.UPDATE_METADATA_REFRESH_DATABASE('{selected_masking_database}')"
-                        session.sql(sql_command).collect()
-                        st.success("✅ Metadata Refresh executed successfully!")
-                    except Exception as e:
-                        st.error(f"❌ Error executing Metadata Refresh: {str(e)}")
-                        success = False
-
-                # Column Tag Mapping
-                if success:
-                    try:
-                        # Execute COLUMN TAG MAPPING
-                        sql_command = f"""
-                        CALL {masking_environment}_DB_MANAGER.MASKING.COLUMN_TAG_MAPPING(
-                            '{selected_classification_database}',
-                            '{selected_classification_schema}',
-                            '{selected_masking_database}',  -- Use selected masking database
-                            '{selected_masking_schema}',    -- Use selected masking schema
-                            '{selected_classification_owner}'
-                        )
-                        """
-                        session.sql(sql_command).collect()
-                        st.success("✅ COLUMN TAG MAPPING executed successfully!")
-                    except Exception as e:
-                        st.error(f"❌ Error executing COLUMN TAG MAPPING: {str(e)}")
-                        success = False
-
-                # Insert Data Output Final
-                if success:
-                    try:
-                        # Execute INSERT DATA OUTPUT FINAL
-                        sql_command = f"""
-                        CALL {masking_environment}_DB_MANAGER.MASKING.INSERT_DATA_OUTPUT_FINAL(
-                            '{selected_masking_database}',  -- Use selected masking database
-                            '{selected_masking_schema}',    -- Use selected masking schema
-                            '{selected_bu_name}',
-                            '{selected_classification_owner}'
-                        )
-                        """
-                        session.sql(sql_command).collect()
-                        st.success("✅ INSERT DATA OUTPUT FINAL executed successfully!")
-                    except Exception as e:
-                        st.error(f"❌ Error executing INSERT DATA OUTPUT FINAL: {str(e)}")
-                        success = False
-
-                 # Classification Generation
-                if success:
-                    try:
-                        # Execute CLASSIFICATION_GENERATION
-                        sql_command = f"CALL DEV_DB_MANAGER.MASKING.CLASSIFICATION_REPORT_V1('{selected_classification_database}', '{selected_classification_schema}', '{selected_classification_owner}');"
-                        session.sql(sql_command).collect()
-                        st.success("✅ CLASSIFICATION_GENERATION executed successfully!")
-                    except Exception as e:
-                        st.error(f"❌ Error executing CLASSIFICATION_GENERATION: {str(e)}")
-                        success = False
-
-                # Create Views
-                if success:
-                    try:
-                        # Execute CREATE VIEWS
-                        sql_command = f"""
-                        CALL {masking_environment}_DB_MANAGER.MASKING.CREATE_VIEWS(
-                            '{selected_masking_database}',  -- Use selected masking database
-                            '{selected_masking_schema}',    -- Use selected masking schema
-                            '{selected_masking_database}_MASKED',
-                            '{selected_masking_schema}'
-                        )
-                        """
-                        session.sql(sql_command).collect()
-                        st.success("✅ CREATE VIEWS executed successfully!")
-                    except Exception as e:
-                        st.error(f"❌ Error executing CREATE VIEWS: {str(e)}")
-                        success = False
-
-                try:
-                    if success:
-                        audit_message = f"MASKING for {selected_masking_database}_MASKED.{selected_masking_schema}"
-                        log_audit(audit_message, "Success", "masking")
-                    else:
-                        audit_message = f"MASKING for {selected_masking_database}_MASKED.{selected_masking_schema}"
-                        log_audit(audit_message, "Failure", "masking")
-                except Exception as e:
-                    st.error(f"❌ Error logging audit: {str(e)}")
+                masking_steps = build_masking_pipeline(
+                    masking_environment, selected_masking_database, selected_masking_schema,
+                    selected_classification_database, selected_classification_schema,
+                    selected_classification_owner, selected_bu_name,
+                )
 
-                if success:
-                    st.success("✅ Completed all processes successfully!")
+                existing_job = find_pipeline_job("MASKING", masking_run_key)
+                if existing_job is not None and existing_job["status"] == "RUNNING":
+                    st.warning("A masking run for this schema is already in progress.")
                 else:
-                    st.warning("Some steps failed. Please review the errors.")
+                    resume_from = None
+                    if resume_masking:
+                        if existing_job is not None and existing_job["status"] in ("FAILED", "INTERRUPTED"):
+                            resume_from = existing_job
+                        else:
+                            st.info("No failed run to resume for this schema; running the full pipeline.")
+                    start_pipeline_job(
+                        "MASKING",
+                        masking_run_key,
+                        masking_steps,
+                        audit_message=f"MASKING for {selected_masking_database}_MASKED.{selected_masking_schema}",
+                        audit_type="masking",
+                        resume_from=resume_from,
+                    )
             else:
                 st.warning("Please ensure all selections are made before running the masking process.")
+
+        # Live step status of the latest masking job for the current selection
+        if selected_masking_database and selected_masking_schema:
+            masking_job = find_pipeline_job("MASKING", masking_run_key)
+            if masking_job is not None:
+                render_pipeline_job(masking_job, "Masking Job Status", "run masking", f"{selected_masking_database}_MASKED")
+
+        # Batch mode: many schemas in one run, sharing the database-level steps
+        if selected_masking_database:
+            render_batch_pipeline(
+                "MASKING", "Masking", masking_environment, selected_masking_database,
+                selected_classification_database, selected_bu_name,
+                lambda schema, owner: build_masking_pipeline(
+                    masking_environment, selected_masking_database, schema,
+                    selected_classification_database, schema, owner, selected_bu_name,
+                ),
+                audit_type="masking",
+                derived_database=f"{selected_masking_database}_MASKED",
+            )
   
            
     elif app_mode_masking == "MASKING VALIDATION":
         # Define all functions inside this block
 
-        def get_databases(env_prefix):
-            db_prefix = f"{env_prefix}_"
-            db_query = f"""
-                SELECT DATABASE_NAME 
-                FROM INFORMATION_SCHEMA.DATABASES 
-                WHERE DATABASE_NAME LIKE '{db_prefix}%'
-            """
-            rows = session.sql(db_query).collect()
-            return [row[0] for row in rows]
-
-        def get_schemas(database):
-            schema_query = f"SELECT SCHEMA_NAME FROM {database}.INFORMATION_SCHEMA.SCHEMATA"
-            rows = session.sql(schema_query).collect()
-            return [row[0] for row in rows]
-
         def get_classification_owners(env):
             owner_query = f"""
                 SELECT DISTINCT CLASSIFICATION_OWNER
                 FROM DEV_DB_MANAGER.MASKING.CLASSIFICATION_DETAILS
             """
-            rows = session.sql(owner_query).collect()
-            return [row[0] for row in rows]
+            return fetch_column(owner_query, "Classification owners")
+
+        # Each validation compares a source metric with a target metric; metrics shared by
+        # several validations are computed once
+        VALIDATION_CHECKS = [
+            ("MD Tables", "SOURCE_TABLES", "MD_TABLES"),
+            ("MD Columns", "SOURCE_COLUMNS", "MD_COLUMNS"),
+            ("Data Set", "MD_COLUMNS", "DATA_SET_COLUMNS"),
+            ("Views", "SOURCE_TABLES", "MASKED_VIEWS"),
+            ("Tags", "CLASSIFIED_COLUMNS", "MASKED_TAGS"),
+        ]
+
+        def build_validation_sets(env, selected_database, selected_schema, classification_owner):
+            """Return {metric name: (query, params)}; each query returns the rows the metric counts."""
+            manager = manager_database(env)
+            masked_database = f"{selected_database}_MASKED"
+            # Derive production database name
+            production_database = selected_database.replace("DEV_", "PROD_").replace("QA_", "PROD_").replace("UAT_", "PROD_")
+            return {
+                "SOURCE_TABLES": (sql_statement("validation_source_tables", database=selected_database),
+                                  [selected_database, selected_schema]),
+                "MD_TABLES": (sql_statement("validation_md_tables", manager_database=manager),
+                              [selected_database, selected_schema]),
+                "SOURCE_COLUMNS": (sql_statement("validation_source_columns", database=selected_database),
+                                   [selected_schema]),
+                "MD_COLUMNS": (sql_statement("validation_md_columns", manager_database=manager),
+                               [selected_database, selected_schema]),
+                "DATA_SET_COLUMNS": (sql_statement("validation_data_set_columns", manager_database=manager),
+                                     [selected_database, selected_schema] * 2),
+                "MASKED_VIEWS": (sql_statement("validation_masked_views", masked_database=masked_database),
+                                 [selected_schema]),
+                "CLASSIFIED_COLUMNS": (sql_statement("validation_classified_columns"),
+                                       [production_database, selected_schema, classification_owner]),
+                "MASKED_TAGS": (sql_statement("validation_masked_tags"), [masked_database, selected_schema]),
+            }
 
-        def execute_validation_queries_tags(env, selected_database, selected_schema, classification_owner):
-            try:
-                # Derive production database name
-                production_database = selected_database.replace("DEV_", "PROD_").replace("QA_", "PROD_").replace("UAT_", "PROD_")
-                # Query source tags
-                source_tags_query = f"""
-                SELECT COUNT(*) AS total_records
-                FROM DEV_DB_MANAGER.MASKING.CLASSIFICATION_DETAILS
-                WHERE "DATABASE" = '{production_database}'
-                  AND "SCHEMA" = '{selected_schema}'
-                  AND CLASSIFICATION_OWNER = '{classification_owner}'
-                """
-                # Query target tags
-                target_tags_query = f"""
-                SELECT COUNT(*) AS TAG_COUNT
-                FROM DEV_DB_MANAGER.ACCOUNT_USAGE.TAG_REFERENCES
-                WHERE OBJECT_DATABASE = '{selected_database}_MASKED'
-                  AND OBJECT_SCHEMA = '{selected_schema}'
-                """
-                source_count = session.sql(source_tags_query).collect()[0][0]
-                target_count = session.sql(target_tags_query).collect()[0][0]
-                return source_count, target_count
-            except Exception as e:
-                return None, str(e)
+        def build_validation_metrics(env, selected_database, selected_schema, classification_owner):
+            """Return {metric name: (single-value COUNT query, params)} for every validation metric."""
+            return {
+                name: (f"SELECT COUNT(*) FROM ({sql})", params)
+                for name, (sql, params) in build_validation_sets(env, selected_database, selected_schema, classification_owner).items()
+            }
 
-        def execute_validation_queries_tables(env, selected_database, selected_schema):
+        # Where the masked tag count comes from: ACCOUNT_USAGE.TAG_REFERENCES lags by up to
+        # a couple of hours and scans the whole account; the per-database INFORMATION_SCHEMA
+        # table function is current but has to be called once per view
+        TAG_BACKENDS = ["ACCOUNT_USAGE", "INFORMATION_SCHEMA"]
+        TAG_REFERENCE_BATCH_SIZE = 25
+        TAG_REFERENCE_MAX_CONCURRENCY = 4
+
+        # Async runs that count masked tags through INFORMATION_SCHEMA; validations and the
+        # backend comparison keep separate runs so neither replaces the other's
+        TAG_VALIDATION_RUN = "masked_tags_validation"
+        TAG_COMPARISON_RUN = "masked_tags_comparison"
+
+        # Function to start counting column tags on the masked views through TAG_REFERENCES_ALL_COLUMNS
+        def start_masked_tag_count(run_name, selected_database, selected_schema):
+            """Fan TAG_REFERENCES_ALL_COLUMNS out over every view as an async run of UNION ALL batches."""
+            masked_database = f"{selected_database}_MASKED"
+            listing_step = f"Views in {masked_database}.{selected_schema}"
+            views = fetch_column(sql_statement("views", database=masked_database), listing_step, [selected_schema])
+            jobs = []
+            for start in range(0, len(views), TAG_REFERENCE_BATCH_SIZE):
+                batch = views[start:start + TAG_REFERENCE_BATCH_SIZE]
+                # LEVEL = 'COLUMN' keeps inherited table/schema tags out, matching DOMAIN = 'COLUMN' in TAG_REFERENCES
+                probe = f"""SELECT 1 FROM TABLE({quote_identifier(masked_database)}.INFORMATION_SCHEMA.TAG_REFERENCES_ALL_COLUMNS(
+                        ?, 'table')) WHERE LEVEL = 'COLUMN'"""
+                jobs.append({
+                    "name": f"Views {start + 1}-{start + len(batch)}",
+                    "sql": "SELECT COUNT(*) FROM (\n" + "\n                    UNION ALL\n".join([probe] * len(batch)) + "\n)",
+                    "params": [quote_identifier(masked_database, selected_schema, view) for view in batch],
+                })
+            run = start_async_queries(run_name, jobs, TAG_REFERENCE_MAX_CONCURRENCY)
+            # The view listing is part of this backend's cost, so its query is timed with the run
+            run["listing_query_id"] = last_query_id(listing_step)
+            return run
+
+        # Function to total a finished tag count run
+        def masked_tag_count(run):
+            failed = [job for job in run["jobs"] if job["status"] == "FAILED"]
+            if failed:
+                raise RuntimeError(f"{failed[0]['name']}: {failed[0]['error']}")
+            return sum(job["result"][0][0] for job in run["jobs"])
+
+        # Function to count masked tags on each backend; the INFORMATION_SCHEMA side runs
+        # asynchronously. Both sides are timed afterwards from Snowflake's query history, from
+        # the start of their first query to the end of their last, so they share one clock
+        def start_tag_backend_comparison(selected_database, selected_schema):
+            account_usage_query, account_usage_params = build_validation_metrics(
+                env, selected_database, selected_schema, ""
+            )["MASKED_TAGS"]
+            account_usage_step = "Masked tag count (ACCOUNT_USAGE)"
+            comparison = {}
             try:
-                db_manager = f"{env}_DB_MANAGER"
-                count_tables_query = f"""
-                SELECT COUNT(TABLE_NAME) 
-                FROM {selected_database}.INFORMATION_SCHEMA.TABLES 
-                WHERE TABLE_CATALOG = '{selected_database}'
-                  AND TABLE_SCHEMA = '{selected_schema}'
-                  AND TABLE_TYPE = 'BASE TABLE'
-                  AND TABLE_NAME NOT LIKE 'RAW_%'
-                  AND TABLE_NAME NOT LIKE 'VW_%'
-                """
-                validation_query = f"""
-                SELECT COUNT(*) AS TABLE_COUNT
-                FROM {db_manager}.MASKING.MD_TABLE t
-                JOIN {db_manager}.MASKING.MD_SCHEMA s ON t.SCHEMA_ID = s.SCHEMA_ID
-                JOIN {db_manager}.MASKING.MD_DATABASE d ON s.DATABASE_ID = d.DATABASE_ID
-                WHERE d.DATABASE_NAME = '{selected_database}'
-                  AND s.SCHEMA_NAME = '{selected_schema}'
-                """
-                table_count = session.sql(count_tables_query).collect()[0][0]
-                validation_count = session.sql(validation_query).collect()[0][0]
-                return table_count, validation_count
+                tag_count, error = execute_sql(account_usage_query, account_usage_step, params=account_usage_params)[0][0], None
             except Exception as e:
-                return None, str(e)
-
-        def execute_validation_queries_columns(env, selected_database, selected_schema):
+                tag_count, error = None, str(e)
+            comparison["ACCOUNT_USAGE"] = {
+                "TAG_COUNT": tag_count,
+                "ELAPSED_SECONDS": None,
+                "ERROR": error,
+                "QUERY_IDS": [last_query_id(account_usage_step)],
+            }
             try:
-                db_manager = f"{env}_DB_MANAGER"
-                count_columns_query = f"""
-                SELECT COUNT(c.COLUMN_NAME) AS COLUMN_COUNT
-                FROM {selected_database}.INFORMATION_SCHEMA.COLUMNS c
-                JOIN {selected_database}.INFORMATION_SCHEMA.TABLES t
-                  ON c.TABLE_SCHEMA = t.TABLE_SCHEMA AND c.TABLE_NAME = t.TABLE_NAME
-                WHERE c.TABLE_SCHEMA = '{selected_schema}'
-                  AND t.TABLE_TYPE = 'BASE TABLE'
-                  AND c.TABLE_NAME NOT LIKE 'RAW_%'
-                  AND c.TABLE_NAME NOT LIKE 'VW_%'
-                """
-                validation_query = f"""
-                SELECT COUNT(col.COLUMN_ID) AS COLUMN_COUNT
-                FROM {db_manager}.MASKING.MD_DATABASE db
-                JOIN {db_manager}.MASKING.MD_SCHEMA sc ON db.DATABASE_ID = sc.DATABASE_ID
-                JOIN {db_manager}.MASKING.MD_TABLE tb ON sc.SCHEMA_ID = tb.SCHEMA_ID
-                JOIN {db_manager}.MASKING.MD_COLUMN col ON tb.TABLE_ID = col.TABLE_ID
-                WHERE db.database_name='{selected_database}'
-                  AND sc.schema_name='{selected_schema}'
-                  AND db.IS_ACTIVE = TRUE
-                  AND sc.IS_ACTIVE = TRUE
-                  AND tb.IS_ACTIVE = TRUE
-                  AND col.IS_ACTIVE = TRUE
-                """
-                column_count = session.sql(count_columns_query).collect()[0][0]
-                validation_count = session.sql(validation_query).collect()[0][0]
-                return column_count, validation_count
+                start_masked_tag_count(TAG_COMPARISON_RUN, selected_database, selected_schema)
             except Exception as e:
-                return None, str(e)
+                comparison["INFORMATION_SCHEMA"] = {"TAG_COUNT": None, "ELAPSED_SECONDS": None, "ERROR": str(e), "QUERY_IDS": []}
+            return comparison
 
-        def execute_validation_queries_views(env, selected_database, selected_schema):
-            try:
-                db_manager = f"{env}_DB_MANAGER"
-                count_tables_query = f"""
-                SELECT COUNT(TABLE_NAME) 
-                FROM {selected_database}.INFORMATION_SCHEMA.TABLES 
-                WHERE TABLE_CATALOG = '{selected_database}'
-                  AND TABLE_SCHEMA = '{selected_schema}'
-                  AND TABLE_TYPE = 'BASE TABLE'
-                  AND TABLE_NAME NOT LIKE 'RAW_%'
-                  AND TABLE_NAME NOT LIKE 'VW_%'
-                """
-                count_target_query = f"""
-                SELECT COUNT(TABLE_NAME) 
-                FROM {selected_database}_MASKED.INFORMATION_SCHEMA.VIEWS
-                WHERE TABLE_SCHEMA = '{selected_schema}'
-                """
-                table_count = session.sql(count_tables_query).collect()[0][0]
-                validation_count = session.sql(count_target_query).collect()[0][0]
-                return table_count, validation_count
-            except Exception as e:
-                return None, str(e)
+        def tag_backend_comparison_dataframe(comparison, run):
+            """One row per backend; the INFORMATION_SCHEMA row comes from the finished run when there is one.
+
+            Elapsed times are looked up once, when both sides are done, and kept in comparison.
+            """
+            if "INFORMATION_SCHEMA" not in comparison:
+                try:
+                    tag_count, error = masked_tag_count(run), None
+                except Exception as e:
+                    tag_count, error = None, str(e)
+                comparison["INFORMATION_SCHEMA"] = {
+                    "TAG_COUNT": tag_count,
+                    "ELAPSED_SECONDS": None,
+                    "ERROR": error,
+                    "QUERY_IDS": [run.get("listing_query_id")] + [job["query_id"] for job in run["jobs"]],
+                }
+            untimed = {
+                backend: [query_id for query_id in row.pop("QUERY_IDS") if query_id]
+                for backend, row in comparison.items() if "QUERY_IDS" in row
+            }
+            if any(untimed.values()):
+                try:
+                    spans = fetch_mapping(sql_statement("query_spans"), "Tag backend timings", [json.dumps(untimed)])
+                except Exception:
+                    spans = {}
+                for backend, elapsed in spans.items():
+                    if elapsed is not None:
+                        comparison[backend]["ELAPSED_SECONDS"] = round(float(elapsed), 2)
+            return pd.DataFrame(
+                [{"BACKEND": backend, **comparison[backend]} for backend in TAG_BACKENDS],
+                columns=["BACKEND", "TAG_COUNT", "ELAPSED_SECONDS", "ERROR"],
+            )
 
-        def execute_validation_queries_data_set(env, selected_database, selected_schema):
+        def build_validation_query(metrics):
+            """Combine the metric queries into one statement: one CTE per metric, one row of counts.
+            Returns (query, params) with the params in CTE order."""
+            ctes = ",\n".join(f"{name} AS ({sql})" for name, (sql, _) in metrics.items())
+            columns = ",\n".join(f"(SELECT * FROM {name}) AS {name}" for name in metrics)
+            params = [value for _, metric_params in metrics.values() for value in metric_params]
+            return f"WITH {ctes}\nSELECT {columns}", params
+
+        def run_validations(env, selected_database, selected_schema, classification_owner, tag_backend="ACCOUNT_USAGE"):
+            """Run every validation in one round trip.
+
+            Returns {"values", "errors", "tag_run"} for validation_results(). If the combined query
+            fails (e.g. the _MASKED database is missing), each metric is retried on its own so one
+            broken metric does not hide the others. With the INFORMATION_SCHEMA tag backend the
+            masked tag count is started as an async run instead of joining the combined query.
+            """
+            metrics = build_validation_metrics(env, selected_database, selected_schema, classification_owner)
+            values, errors, tag_run = {}, {}, None
+            if tag_backend == "INFORMATION_SCHEMA":
+                del metrics["MASKED_TAGS"]
+                try:
+                    start_masked_tag_count(TAG_VALIDATION_RUN, selected_database, selected_schema)
+                    tag_run = TAG_VALIDATION_RUN
+                except Exception as e:
+                    errors["MASKED_TAGS"] = str(e)
             try:
-                db_manager = f"{env}_DB_MANAGER"
-                count_columns_query = f"""
-                SELECT COUNT(col.COLUMN_ID) AS COLUMN_COUNT
-                FROM {db_manager}.MASKING.MD_DATABASE db
-                JOIN {db_manager}.MASKING.MD_SCHEMA sc ON db.DATABASE_ID = sc.DATABASE_ID
-                JOIN {db_manager}.MASKING.MD_TABLE tb ON sc.SCHEMA_ID = tb.SCHEMA_ID
-                JOIN {db_manager}.MASKING.MD_COLUMN col ON tb.TABLE_ID = col.TABLE_ID
-                WHERE db.database_name='{selected_database}'
-                  AND sc.schema_name='{selected_schema}'
-                  AND db.IS_ACTIVE = TRUE
-                  AND sc.IS_ACTIVE = TRUE
-                  AND tb.IS_ACTIVE = TRUE
-                  AND col.IS_ACTIVE = TRUE
-                """
-                validation_query = f"""
-                SELECT COUNT(*) AS total_records
-                FROM (
-                    SELECT DISTINCT
-                        ds.data_output_id,
-                        d.database_name,
-                        s.schema_name,
-                        t.table_name,
-                        c.column_name
-                    FROM {db_manager}.MASKING.DATA_SET ds
-                    INNER JOIN {db_manager}.MASKING.MD_DATABASE d ON ds.database_id = d.database_id
-                    INNER JOIN {db_manager}.MASKING.MD_SCHEMA s ON ds.schema_id = s.schema_id
-                    INNER JOIN {db_manager}.MASKING.MD_TABLE t ON ds.TABLE_ID = t.TABLE_ID
-                    INNER JOIN {db_manager}.MASKING.MD_COLUMN c ON ds.COLUMN_ID = c.COLUMN_ID
-                    WHERE d.database_name = '{selected_database}'
-                      AND s.schema_name = '{selected_schema}'
-                      AND ds.data_output_id = (
-                          SELECT MAX(ds1.data_output_id) 
-                          FROM {db_manager}.MASKING.DATA_SET ds1
-                          INNER JOIN {db_manager}.MASKING.MD_DATABASE d1 ON ds1.database_id = d1.database_id
-                          INNER JOIN {db_manager}.MASKING.MD_SCHEMA s1 ON ds1.schema_id = s1.schema_id
-                          WHERE d1.database_name = '{selected_database}'
-                            AND s1.schema_name = '{selected_schema}'
-                      )
-                ) AS subquery
-                """
-                column_count = session.sql(count_columns_query).collect()[0][0]
-                data_count = session.sql(validation_query).collect()[0][0]
-                return column_count, data_count
-            except Exception as e:
-                return None, str(e)
+                validation_query, validation_params = build_validation_query(metrics)
+                row = execute_sql(validation_query, "Validation metrics", params=validation_params)[0]
+                values.update({name: row[name] for name in metrics})
+            except Exception:
+                for name, (sql, params) in metrics.items():
+                    try:
+                        values[name] = execute_sql(sql, f"Validation metric {name}", params=params)[0][0]
+                    except Exception as e:
+                        errors[name] = str(e)
+            return {"values": values, "errors": errors, "tag_run": tag_run}
+
+        def validation_results(validation):
+            """{validation: {"Source Count", "Target Count", "Error"}}, with the masked tag count
+            taken from the finished async run when there is one."""
+            values, errors = dict(validation["values"]), dict(validation["errors"])
+            if validation["tag_run"]:
+                try:
+                    values["MASKED_TAGS"] = masked_tag_count(get_async_run(validation["tag_run"]))
+                except Exception as e:
+                    errors["MASKED_TAGS"] = str(e)
+
+            results = {}
+            for validation_type, source_metric, target_metric in VALIDATION_CHECKS:
+                error = errors.get(source_metric) or errors.get(target_metric)
+                results[validation_type] = {
+                    "Source Count": None if error else values[source_metric],
+                    "Target Count": None if error else values[target_metric],
+                    "Error": error,
+                }
+            return results
+
+        # Row-level diff entities: (source metric, target metric) whose rows are compared
+        DIFF_ENTITIES = {
+            "Tables": ("SOURCE_TABLES", "MD_TABLES"),
+            "Columns": ("SOURCE_COLUMNS", "MD_COLUMNS"),
+            "Views": ("SOURCE_TABLES", "MASKED_VIEWS"),
+            "Tags": ("CLASSIFIED_COLUMNS", "MASKED_TAGS"),
+        }
+
+        def build_diff_sets(env, selected_database, selected_schema, classification_owner):
+            """Return {entity: ((source query, params), (target query, params))}; both sides return the same key columns."""
+            validation_sets = build_validation_sets(env, selected_database, selected_schema, classification_owner)
+            return {
+                entity: (validation_sets[source_metric], validation_sets[target_metric])
+                for entity, (source_metric, target_metric) in DIFF_ENTITIES.items()
+            }
+
+        def build_diff_query(source, target):
+            """Set difference in both directions, computed in Snowflake: MISSING rows are in the
+            source but not the target, EXTRA rows are in the target but not the source.
+            Takes and returns (query, params)."""
+            (source_query, source_params), (target_query, target_params) = source, target
+            return f"""
+            WITH source_set AS ({source_query}),
+                 target_set AS ({target_query})
+            SELECT 'MISSING' AS DIFF, * FROM (SELECT * FROM source_set EXCEPT SELECT * FROM target_set)
+            UNION ALL
+            SELECT 'EXTRA' AS DIFF, * FROM (SELECT * FROM target_set EXCEPT SELECT * FROM source_set)
+            """, source_params + target_params
 
         # User input selections
-        env = st.selectbox("Select Environment", ["DEV", "QA", "UAT", "PROD"])
-        database_list = get_databases(env)
+        env = st.selectbox("Select Environment", ENVIRONMENTS)
+        database_list = get_databases(env, exclude_derived=False)
         selected_database = st.selectbox("Select Database", database_list, key="db_select")
         schema_list = get_schemas(selected_database)
         selected_schema = st.selectbox("Select Schema", schema_list, key="schema_select")
+        if selected_database and not get_derived_database(selected_database, "MASKED"):
+            st.warning(f"{selected_database}_MASKED does not exist yet; view and tag validations will fail.")
         classification_owners = get_classification_owners(env)
         classification_owner = st.selectbox("Select Classification Owner", classification_owners)
 
+        tag_backend = st.radio("Tag Validation Source", TAG_BACKENDS, horizontal=True, key="tag_backend")
+
         if st.button("Run All Validations"):
-            results = {}
+            # Run all validations in a single consolidated query
+            st.session_state.validation_run = run_validations(
+                env, selected_database, selected_schema, classification_owner, tag_backend
+            )
 
-            # Run all validations
-            table_count, table_validation_count = execute_validation_queries_tables(env, selected_database, selected_schema)
-            results['MD Tables'] = {
-                "Source Count": table_count,
-                "Target Count": table_validation_count,
-            }
-            column_count, column_validation_count = execute_validation_queries_columns(env, selected_database, selected_schema)
-            results['MD Columns'] = {
-                "Source Count": column_count,
-                "Target Count": column_validation_count,
-            }
-            dataset_count, dataset_data_count = execute_validation_queries_data_set(env, selected_database, selected_schema)
-            results['Data Set'] = {
-                "Source Count": dataset_count,
-                "Target Count": dataset_data_count,
-            }
-            view_table_count, validation_count = execute_validation_queries_views(env, selected_database, selected_schema)
-            results['Views'] = {
-                "Source Count": view_table_count,
-                "Target Count": validation_count,
-            }
-            tags_source_count, tags_target_count = execute_validation_queries_tags(env, selected_database, selected_schema, classification_owner)
-            results['Tags'] = {
-                "Source Count": tags_source_count,
-                "Target Count": tags_target_count,
-            }
+        # Display results once an INFORMATION_SCHEMA tag count, if any, has finished
+        validation_run = st.session_state.get("validation_run")
+        if validation_run:
+            tag_run = get_async_run(validation_run["tag_run"]) if validation_run["tag_run"] else None
+            if tag_run is None or render_async_run(tag_run):
+                for validation_type, counts in validation_results(validation_run).items():
+                    st.markdown(f"### {validation_type} Validation Results")
+                    if counts["Error"]:
+                        st.error(f"Error during {validation_type} validation: {counts['Error']}")
+                    else:
+                        st.success(f"Source Count: {counts['Source Count']}, Target Count: {counts['Target Count']}")
+
+        if st.button("Compare Tag Backends") and selected_database and selected_schema:
+            st.session_state.tag_backend_comparison = start_tag_backend_comparison(selected_database, selected_schema)
+
+        tag_backend_comparison = st.session_state.get("tag_backend_comparison")
+        if tag_backend_comparison:
+            comparison_run = None if "INFORMATION_SCHEMA" in tag_backend_comparison else get_async_run(TAG_COMPARISON_RUN)
+            if comparison_run is None or render_async_run(comparison_run):
+                st.dataframe(
+                    tag_backend_comparison_dataframe(tag_backend_comparison, comparison_run), use_container_width=True
+                )
+
+        # Row-level diff: the actual missing/extra objects, paged from Snowflake
+        st.markdown("### Row-Level Diff")
+        diff_col1, diff_col2 = st.columns(2)
+        with diff_col1:
+            diff_entity = st.selectbox("Compare", list(DIFF_ENTITIES), key="diff_entity")
+        with diff_col2:
+            diff_page_size = st.selectbox("Rows per page", [100, 500, 1000], key="diff_page_size")
+
+        if st.button("Compute Diff") and selected_database and selected_schema:
+            source, target = build_diff_sets(env, selected_database, selected_schema, classification_owner)[diff_entity]
+            diff_query, diff_params = build_diff_query(source, target)
+            try:
+                summary = execute_sql(f"""
+                    SELECT COUNT_IF(DIFF = 'MISSING') AS MISSING, COUNT_IF(DIFF = 'EXTRA') AS EXTRA
+                    FROM ({diff_query})
+                """, f"{diff_entity} diff summary", params=diff_params)[0]
+                # A new version per computed diff also resets the page number
+                st.session_state.diff_version = st.session_state.get("diff_version", 0) + 1
+                st.session_state.validation_diff = {
+                    "label": f"{diff_entity} for {selected_database}.{selected_schema}",
+                    "query": diff_query,
+                    "params": diff_params,
+                    # DIFF plus the entity's key columns
+                    "order_by": "1, 2, 3" if diff_entity in ("Columns", "Tags") else "1, 2",
+                    "missing": summary["MISSING"],
+                    "extra": summary["EXTRA"],
+                    "csv": None,
+                }
+            except Exception as e:
+                st.error(f"Error computing {diff_entity} diff: {e}")
+                st.session_state.validation_diff = None
+
+        validation_diff = st.session_state.get("validation_diff")
+        if validation_diff:
+            total_rows = validation_diff["missing"] + validation_diff["extra"]
+            st.caption(f"{validation_diff['label']}: {validation_diff['missing']} missing in target, "
+                       f"{validation_diff['extra']} extra in target")
+            if total_rows == 0:
+                st.success("No differences found.")
+            else:
+                page_count = (total_rows + diff_page_size - 1) // diff_page_size
+                page_number = st.number_input(
+                    "Page", min_value=1, max_value=page_count, value=1,
+                    key=f"diff_page_{st.session_state.diff_version}_{diff_page_size}",
+                )
+                page_query = f"""
+                    SELECT * FROM ({validation_diff['query']})
+                    ORDER BY {validation_diff['order_by']}
+                    LIMIT {int(diff_page_size)} OFFSET {(int(page_number) - 1) * int(diff_page_size)}
+                """
+                try:
+                    st.dataframe(
+                        fetch_dataframe(page_query, f"Diff page {page_number}", validation_diff["params"]),
+                        use_container_width=True,
+                    )
+                except Exception as e:
+                    st.error(f"Error fetching diff page: {e}")
+
+                if st.button("Prepare Download"):
+                    # Stream the full diff into the CSV batch by batch
+                    validation_diff["csv"] = "".join(
+                        batch.to_csv(index=False, header=batch_number == 0)
+                        for batch_number, batch in enumerate(iter_dataframes(
+                            validation_diff["query"], "Diff download", validation_diff["params"]
+                        ))
+                    )
+                if validation_diff["csv"] is not None:
+                    st.download_button(
+                        "Download Diff (CSV)",
+                        validation_diff["csv"],
+                        file_name=f"{validation_diff['label'].replace(' ', '_')}_diff.csv",
+                        mime="text/csv",
+                    )
 
-            # Display results
-            for validation_type, counts in results.items():
-                st.markdown(f"### {validation_type} Validation Results")
-                if None in counts.values():
-                    st.error(f"Error during {validation_type} validation.")
+        # Fleet validation: every <DB>_MASKED database and schema, validated concurrently
+        st.markdown("### Fleet Validation")
+        fleet_col1, fleet_col2 = st.columns(2)
+        with fleet_col1:
+            fleet_environments = st.multiselect("Environments", ENVIRONMENTS, default=ENVIRONMENTS, key="fleet_environments")
+        with fleet_col2:
+            fleet_concurrency = st.number_input(
+                "Max Concurrent Validations", min_value=1, max_value=32, value=8, key="fleet_concurrency"
+            )
+
+        if st.button("Run Fleet Validation"):
+            database_index = get_database_index()
+            fleet_jobs, fleet_targets = [], {}
+            for base_database, derived in sorted(database_index["derived"].items()):
+                masked_database = derived.get("MASKED")
+                fleet_env = base_database.split("_", 1)[0]
+                if not masked_database or fleet_env not in fleet_environments:
+                    continue
+                production_database = base_database.replace("DEV_", "PROD_").replace("QA_", "PROD_").replace("UAT_", "PROD_")
+                try:
+                    owners = get_latest_classification_owners(production_database)
+                except Exception:
+                    owners = {}
+                for fleet_schema in get_schemas(masked_database):
+                    if fleet_schema == "INFORMATION_SCHEMA":
+                        continue
+                    metrics = build_validation_metrics(fleet_env, base_database, fleet_schema, owners.get(fleet_schema, "ALTR"))
+                    job_name = f"{base_database}.{fleet_schema}"
+                    fleet_query, fleet_params = build_validation_query(metrics)
+                    fleet_jobs.append({"name": job_name, "sql": fleet_query, "params": fleet_params})
+                    fleet_targets[job_name] = {"ENVIRONMENT": fleet_env, "DATABASE": base_database, "SCHEMA": fleet_schema}
+
+            if fleet_jobs:
+                fleet_run = start_async_queries("fleet_validation", fleet_jobs, max_concurrency=fleet_concurrency)
+                fleet_run["targets"] = fleet_targets
+            else:
+                st.info("No _MASKED databases found for the selected environments.")
+
+        # The matrix is built on the rerun after the last validation finishes
+        fleet_run = get_async_run("fleet_validation")
+        if fleet_run is not None and render_async_run(fleet_run):
+            matrix_rows = []
+            for job in fleet_run["jobs"]:
+                matrix_row = dict(fleet_run["targets"][job["name"]])
+                if job["status"] == "SUCCESS":
+                    counts = job["result"][0]
+                    for validation_type, source_metric, target_metric in VALIDATION_CHECKS:
+                        matrix_row[validation_type] = "PASS" if counts[source_metric] == counts[target_metric] else "FAIL"
                 else:
-                    st.success(f"Source Count: {counts['Source Count']}, Target Count: {counts['Target Count']}")
+                    for validation_type, _, _ in VALIDATION_CHECKS:
+                        matrix_row[validation_type] = "ERROR"
+                matrix_row["ELAPSED_SECONDS"] = round(job["finished_at"] - job["started_at"], 1)
+                matrix_row["ERROR"] = job["error"]
+                matrix_rows.append(matrix_row)
+            fleet_matrix = pd.DataFrame(matrix_rows)
+            failing = sum(1 for row in matrix_rows if any(row[check[0]] != "PASS" for check in VALIDATION_CHECKS))
+            st.caption(f"{len(matrix_rows)} schemas validated in "
+                       f"{fleet_run['finished_at'] - fleet_run['started_at']:.1f}s; {failing} with failures.")
+            st.dataframe(fleet_matrix, use_container_width=True)
 
         
                     
@@ -1063,38 +2463,17 @@ elif app_mode == "Snowflake Encryption":
         session = get_active_session()
 
         import re
-    # Then select Source Database
-        def get_databases(env):
-            db_prefix = f"{env}_"
-            db_query = f"""
-            SELECT DATABASE_NAME
-            FROM INFORMATION_SCHEMA.DATABASES
-            WHERE DATABASE_NAME LIKE '{db_prefix}%'
-            AND DATABASE_NAME NOT LIKE '%_MASKED%' AND DATABASE_NAME NOT LIKE '%_ENCRYPT%'
-            """
-            rows = session.sql(db_query).collect()
-            return [row[0] for row in rows]
-
-        # Function to fetch schemas for a specific database
-        def get_schemas(database_name):
-            if not database_name:
-                return []
-            schema_query = f"SELECT SCHEMA_NAME FROM {database_name}.INFORMATION_SCHEMA.SCHEMATA"
-            rows = session.sql(schema_query).collect()
-            return [row[0] for row in rows]
 
         # Function to fetch distinct BU names based on environment
         def get_bu_names(env):
-            bu_query = f"SELECT DISTINCT BU_NAME FROM {env}_DB_MANAGER.MASKING.CONSUMER"
             try:
-                rows = session.sql(bu_query).collect()
-                return [row[0] for row in rows]
+                return fetch_column(sql_statement("bu_names", manager_database=manager_database(env)), f"BU names in {env}")
             except Exception as e:
                 st.warning(f"Could not fetch BU names for environment {env}: {e}")
                 return []
 
         # Input selections for masking environment
-        encryption_environment = st.selectbox("Encryption Environment", ["DEV", "QA", "UAT", "PROD"])
+        encryption_environment = st.selectbox("Encryption Environment", ENVIRONMENTS)
 
         # Get databases based on the selected environment
         masking_database_list = get_databases(encryption_environment)
@@ -1120,147 +2499,77 @@ elif app_mode == "Snowflake Encryption":
         bu_name_list = get_bu_names(encryption_environment)
         selected_bu_name = st.selectbox("BU Name", bu_name_list)
 
-        # Get classification owner based on the new query criteria
-        classification_owner_list = []
+        # Get classification owner from the shared owner index
+        classification_owners = {}
         if selected_classification_database and selected_classification_schema:
-            owner_query = f"""
-            WITH latest_import AS (
-              SELECT MAX(import_id) AS max_id
-              FROM DEV_DB_MANAGER.MASKING.RAW_CLASSIFICATION_DETAILS
-              WHERE database_name = '{selected_classification_database}'
-              AND schema_name = '{selected_classification_schema}'
-            )
-            SELECT DISTINCT classification_owner
-            FROM DEV_DB_MANAGER.MASKING.RAW_CLASSIFICATION_DETAILS
-            WHERE database_name = '{selected_classification_database}'
-              AND schema_name = '{selected_classification_schema}'
-              AND import_id = (SELECT max_id FROM latest_import);
-            """
             try:
-                rows = session.sql(owner_query).collect()
-                classification_owner_list = [row[0] for row in rows]
+                classification_owners = get_latest_classification_owners(selected_classification_database)
             except Exception as e:
                 st.warning(f"Could not fetch classification owner: {e}")
-                classification_owner_list = []
+                classification_owners = {}
+
+        # Use classification owner from the owner index or fallback to "ALTR"
+        selected_classification_owner = classification_owners.get(selected_classification_schema, "ALTR")
 
-        # Use classification owner from query results or fallback to "ALTR"
-        selected_classification_owner = classification_owner_list[0] if classification_owner_list else "ALTR"
+        # Key identifying one encryption target; the latest job for it is shown across reruns
+        encryption_run_key = f"{encryption_environment}|{selected_masking_database}|{selected_masking_schema}|{selected_classification_owner}"
 
-        # Button to execute all the masking processes
+        # Button to start the encryption pipeline as a background job
+        resume_encryption = st.checkbox(
+            "Resume from failed step",
+            key="resume_encryption",
+            help="Skip steps that already succeeded with unchanged inputs in the last run for this schema.",
+        )
         if st.button("Run Encryption"):
             if (selected_masking_database and selected_masking_schema and
                 selected_bu_name and selected_classification_database and selected_classification_schema):
 
-                # Track success of all operations
-                success = True
-
-                # Execute each process in sequence
-                if selected_classification_owner == "ALTR":
-                    try:
-                        # Execute ALTR MAPPER
-                        sql_command = f"""
-                        CALL ALTR_DSAAS_DB.PUBLIC.ALTR_TAG_MAPPER(
-                            MAPPING_FILE_PATH => BUILD_SCOPED_FILE_URL(@ALTR_DSAAS_DB.PUBLIC.ALTR_TAG_MAPPER_STAGE, 'gdlp-to-hipaa-map.json'),
-                            TAG_DB => '{encryption_environment}_DB_MANAGER',
-                            TAG_SCHEMA => 'MASKING',
-                            RUN_COMMENT => '{selected_classification_database} DATABASE CLASSIFICATION',
-                            USE_DATABASES => '{selected_classification_database}',
-                            EXECUTE_SQL => FALSE,
-                            LOG_TABLE => 'CLASSIFICATION_DETAILS'
-                        );
-                        """
-                        session.sql(sql_command).collect()
-                        st.success("✅ ALTR MAPPER executed successfully!")
-                    except Exception as e:
-                        st.error(f"❌ Error executing ALTR MAPPER: {str(e)}")
-                        success = False
-
-                    if success:
-                        try:
-                            # Execute ALTR CLASSIFICATION DETAILS
-                            sql_command = f"CALL DEV_DB_MANAGER.MASKING.ALTR_CLASSIFICATION_DETAILS('{selected_classification_database}', '{selected_classification_schema}')"
-                            session.sql(sql_command).collect()
-                            st.success("✅ ALTR CLASSIFICATION DETAILS executed successfully!")
-                        except Exception as e:
-                            st.error(f"❌ Error executing ALTR CLASSIFICATION DETAILS: {str(e)}")
-                            success = False
-
-                # Section for handling transfers when classification owner is NOT ALTR
-                if selected_classification_owner != "ALTR":
-                    try:
-                        # Execute TRANSFER CLASSIFICATION DETAILS
-                        sql_command = f"CALL DEV_DB_MANAGER.MASKING.TRANSFER_CLASSIFICATION_DETAILS('{selected_classification_database}', '{selected_classification_schema}', '{selected_classification_owner}')"
-                        session.sql(sql_command).collect()
-                        st.success("✅ TRANSFER CLASSIFICATION DETAILS executed successfully!")
-                    except Exception as e:
-                        st.error(f"❌ Error executing TRANSFER CLASSIFICATION DETAILS: {str(e)}")
-                        success = False
-
-                # Insert Data Output Final
-                if success:
-                    try:
-                        # Execute INSERT DATA OUTPUT FINAL
-                        sql_command = f"""
-                        CALL {encryption_environment}_DB_MANAGER.MASKING.INSERT_DATA_OUTPUT_FINAL_ENCRYPTION(
-                            '{selected_masking_database}',  -- Use selected masking database
-                            '{selected_masking_schema}',    -- Use selected masking schema
-                            '{selected_bu_name}',
-                            '{selected_classification_owner}'
-                        )
-                        """
-                        session.sql(sql_command).collect()
-                        st.success("✅ INSERT DATA OUTPUT FINAL executed successfully!")
-                    except Exception as e:
-                        st.error(f"❌ Error executing INSERT DATA OUTPUT FINAL: {str(e)}")
-                        success = False
-
-                # Classification Generation
-                if success:
-                    try:
-                        # Execute CLASSIFICATION_GENERATION
-                        sql_command = f"CALL DEV_DB_MANAGER.MASKING.CLASSIFICATION_REPORT_V1('{selected_classification_database}', '{selected_classification_schema}', '{selected_classification_owner}');"
-                        session.sql(sql_command).collect()
-                        st.success("✅ CLASSIFICATION_GENERATION executed successfully!")
-                    except Exception as e:
-                        st.error(f"❌ Error executing CLASSIFICATION_GENERATION: {str(e)}")
-                        success = False
-
-
-                # Create Tables
-                if success:
-                    try:
-                        # Execute CREATE TABLES
-                        sql_command = f"""
-                        CALL {encryption_environment}_DB_MANAGER.ENCRYPTION.ENCRYPT_TABLES(
-                            '{selected_masking_database}',  -- Use selected masking database
-                            '{selected_masking_schema}',    -- Use selected masking schema
-                            '{selected_masking_database}_ENCRYPT',
-                            '{selected_masking_schema}'
-                        )
-                        """
-                        session.sql(sql_command).collect()
-                        st.success("✅ CREATE TABLES executed successfully!")
-                    except Exception as e:
-                        st.error(f"❌ Error executing CREATE TABLES: {str(e)}")
-                        success = False
-                # Insert a single audit record for the entire process
-                try:
-                    if success:
-                        audit_message = f"ENCRYPTION for {selected_masking_database}_ENCRYPT.{selected_masking_schema}"
-                        log_audit(audit_message, "Success", "encryption")
-                    else:
-                        audit_message = f"ENCRYPTION for {selected_masking_database}_ENCRYPT.{selected_masking_schema}"
-                        log_audit(audit_message, "Failure", "encryption")
-                except Exception as e:
-                    st.error(f"❌ Error logging audit: {str(e)}")
+                encryption_steps = build_encryption_pipeline(
+                    encryption_environment, selected_masking_database, selected_masking_schema,
+                    selected_classification_database, selected_classification_schema,
+                    selected_classification_owner, selected_bu_name,
+                )
 
-                if success:
-                    st.success("✅ Completed all processes successfully!")
+                existing_job = find_pipeline_job("ENCRYPTION", encryption_run_key)
+                if existing_job is not None and existing_job["status"] == "RUNNING":
+                    st.warning("An encryption run for this schema is already in progress.")
                 else:
-                    st.warning("Some steps failed. Please review the errors.")
+                    resume_from = None
+                    if resume_encryption:
+                        if existing_job is not None and existing_job["status"] in ("FAILED", "INTERRUPTED"):
+                            resume_from = existing_job
+                        else:
+                            st.info("No failed run to resume for this schema; running the full pipeline.")
+                    start_pipeline_job(
+                        "ENCRYPTION",
+                        encryption_run_key,
+                        encryption_steps,
+                        audit_message=f"ENCRYPTION for {selected_masking_database}_ENCRYPT.{selected_masking_schema}",
+                        audit_type="encryption",
+                        resume_from=resume_from,
+                    )
             else:
                 st.warning("Please ensure all selections are made before running the masking process.")
 
+        # Live step status of the latest encryption job for the current selection
+        if selected_masking_database and selected_masking_schema:
+            encryption_job = find_pipeline_job("ENCRYPTION", encryption_run_key)
+            if encryption_job is not None:
+                render_pipeline_job(encryption_job, "Encryption Job Status", "run encryption", f"{selected_masking_database}_ENCRYPT")
+
+        # Batch mode: many schemas in one run, sharing the database-level steps
+        if selected_masking_database:
+            render_batch_pipeline(
+                "ENCRYPTION", "Encryption", encryption_environment, selected_masking_database,
+                selected_classification_database, selected_bu_name,
+                lambda schema, owner: build_encryption_pipeline(
+                    encryption_environment, selected_masking_database, schema,
+                    selected_classification_database, schema, owner, selected_bu_name,
+                ),
+                audit_type="encryption",
+                derived_database=f"{selected_masking_database}_ENCRYPT",
+            )
+
 # Classifications App with Auto-Save
 if app_mode == "Classifications":
     session = get_active_session()
@@ -1281,82 +2590,122 @@ if app_mode == "Classifications":
     
     elif app_mode_classification == "Classification edit and Submission":
         # Session state initialization
-        for key in ["report_fetched", "edited_df", "submitted", "confirm_submission", "last_save_time", "auto_save_key"]:
+        for key in ["report_fetched", "edited_df", "submitted", "confirm_submission", "auto_save_queue", "auto_save_key", "saved_row_hashes",
+                    "report_scope", "report_filter_key", "report_filter_version", "report_total_rows", "report_page_key"]:
             if key not in st.session_state:
-                if key == "edited_df":
+                if key in ("edited_df", "auto_save_queue", "report_scope", "report_filter_key", "report_page_key"):
                     st.session_state[key] = None
-                elif key == "last_save_time":
-                    st.session_state[key] = 0
-                elif key == "auto_save_key":
+                elif key == "saved_row_hashes":
+                    st.session_state[key] = {}
+                elif key in ("auto_save_key", "report_filter_version", "report_total_rows"):
                     st.session_state[key] = 0
                 else:
                     st.session_state[key] = False
 
         # Helper functions
-        def fetch_databases():
-            session = get_active_session()
-            rows = session.sql("""
-                SELECT DATABASE_NAME FROM INFORMATION_SCHEMA.DATABASES 
-                WHERE DATABASE_NAME LIKE 'PROD_%' AND DATABASE_NAME NOT LIKE '%_MASKED%' AND DATABASE_NAME NOT LIKE '%_ENCRYPT%'
-            """).collect()
-            return [row[0] for row in rows]
-
-        def fetch_schemas(database):
-            session = get_active_session()
-            rows = session.sql(f"SELECT SCHEMA_NAME FROM {database}.INFORMATION_SCHEMA.SCHEMATA").collect()
-            return [row[0] for row in rows]
+        # The report is read one page at a time with filters and sorting pushed down to Snowflake
+        REPORT_APPROVAL_STATUSES = ['MASK', 'APPROVED', 'NO MASKING NEEDED']
+        REPORT_SORT_COLUMNS = ["TABLE_NAME", "COLUMN_NAME", "CLASSIFICATION", "BU_APPROVAL_STATUS", "MASKED", "ID"]
+        REPORT_PAGE_SIZES = [100, 500, 1000]
+
+        # Function to build the WHERE clause for the latest report version and the reviewer's filters;
+        # returns (condition, params) with every value bound
+        def classification_report_filter(database, schema, filters):
+            conditions = [
+                "DATABASE_NAME = ?",
+                "SCHEMA_NAME = ?",
+                """VERSION = (
+                      SELECT MAX(VERSION)
+                      FROM DEV_DB_MANAGER.MASKING.CLASSIFICATION_REPORT_V1
+                      WHERE DATABASE_NAME = ? 
+                        AND SCHEMA_NAME = ?
+                  )""",
+            ]
+            params = [database, schema, database, schema]
+            if filters.get("table_name"):
+                conditions.append("TABLE_NAME ILIKE ?")
+                params.append(f"%{filters['table_name']}%")
+            for column, key in (("CLASSIFICATION", "classifications"), ("BU_APPROVAL_STATUS", "approval_statuses")):
+                if filters.get(key):
+                    conditions.append(f"{column} IN ({', '.join('?' for _ in filters[key])})")
+                    params.extend(filters[key])
+            if filters.get("masked"):
+                conditions.append("MASKED = ?")
+                params.append(filters["masked"])
+            return "\n                  AND ".join(conditions), params
+
+        # Function to list the classifications in the latest report with their row counts
+        def get_report_classifications(database, schema):
+            condition, params = classification_report_filter(database, schema, {})
+            return fetch_mapping(f"""
+                SELECT CLASSIFICATION, COUNT(*)
+                FROM DEV_DB_MANAGER.MASKING.CLASSIFICATION_REPORT_V1
+                WHERE {condition}
+                GROUP BY CLASSIFICATION
+                ORDER BY CLASSIFICATION
+            """, "Report classifications", params)
+
+        def count_classification_report(database, schema, filters):
+            condition, params = classification_report_filter(database, schema, filters)
+            return execute_sql(f"""
+                SELECT COUNT(*)
+                FROM DEV_DB_MANAGER.MASKING.CLASSIFICATION_REPORT_V1
+                WHERE {condition}
+            """, "Classification report row count", params=params)[0][0]
 
-        def fetch_classification_report(database, schema):
-            session = get_active_session()
+        def fetch_classification_report(database, schema, filters, sort_column, descending, page_size, page_number):
+            condition, params = classification_report_filter(database, schema, filters)
+            # sort_column comes from REPORT_SORT_COLUMNS; page bounds are integers
             query = f"""
                 SELECT * 
                 FROM DEV_DB_MANAGER.MASKING.CLASSIFICATION_REPORT_V1
-                WHERE DATABASE_NAME = '{database}' 
-                  AND SCHEMA_NAME = '{schema}' 
-                  AND VERSION = (
-                      SELECT MAX(VERSION)
-                      FROM DEV_DB_MANAGER.MASKING.CLASSIFICATION_REPORT_V1
-                      WHERE DATABASE_NAME = '{database}' 
-                        AND SCHEMA_NAME = '{schema}'
-                  )
+                WHERE {condition}
+                ORDER BY {quote_identifier(sort_column)} {"DESC" if descending else "ASC"}, ID
+                LIMIT {int(page_size)} OFFSET {(int(page_number) - 1) * int(page_size)}
             """
-            return session.sql(query).collect()
-
-        def save_classification_report(df, database, schema, show_message=True):
-            session = get_active_session()
+            return fetch_dataframe(query, f"Classification report page {page_number}", params)
+
+        # Columns written by auto-save, in the order of the report table
+        REPORT_SAVE_COLUMNS = [
+            "DATABASE_NAME", "SCHEMA_NAME", "CLASSIFICATION_OWNER", "DATE",
+            "TABLE_NAME", "COLUMN_NAME", "CLASSIFICATION", "HIPAA_CLASS",
+            "MASKED", "BU_APPROVAL_STATUS", "BU_COMMENTS", "BU_ASSIGNEE",
+            "INFOSEC_APPROVAL_STATUS", "INFOSEC_APPROVER", "INFOSEC_COMMENTS",
+            "IS_ACTIVE", "VERSION", "ID",
+        ]
+        REPORT_STAGE_TABLE = "CLASSIFICATION_REPORT_V1_STAGE"
+
+        def save_classification_report(df, database, schema, show_message=True, session=None):
+            session = session or get_active_session()
+            # Rows are matched on ID; a row without one (e.g. added in the editor) cannot be saved
+            df = df[df["ID"].notna()]
+            if df.empty:
+                return True
             try:
-                values = []
-                for _, row in df.iterrows():
-                    # Handle potential None values and escape single quotes
-                    def safe_str(val):
-                        if val is None:
-                            return ''
-                        return str(val).replace("'", "''")
-                    
-                    values.append(f"""(
-                        '{safe_str(database)}', '{safe_str(schema)}', '{safe_str(row['CLASSIFICATION_OWNER'])}', '{safe_str(row['DATE'])}',
-                        '{safe_str(row['TABLE_NAME'])}', '{safe_str(row['COLUMN_NAME'])}', '{safe_str(row['CLASSIFICATION'])}',
-                        '{safe_str(row['HIPAA_CLASS'])}', '{safe_str(row['MASKED'])}', '{safe_str(row['BU_APPROVAL_STATUS'])}',
-                        '{safe_str(row['BU_COMMENTS'])}', '{safe_str(row['BU_ASSIGNEE'])}', '{safe_str(row['INFOSEC_APPROVAL_STATUS'])}',
-                        '{safe_str(row['INFOSEC_APPROVER'])}', '{safe_str(row['INFOSEC_COMMENTS'])}',
-                        {int(row['IS_ACTIVE']) if row['IS_ACTIVE'] is not None else 0},
-                        {int(row['VERSION']) if row['VERSION'] is not None else 1},
-                        {int(row['ID'])}
-                    )""")
-                values_str = ",\n".join(values)
+                # Normalise the payload column-wise: text columns become strings with None as '',
+                # flags and versions get the same defaults the report table expects
+                staged = df.reindex(columns=REPORT_SAVE_COLUMNS)
+                staged["DATABASE_NAME"] = database
+                staged["SCHEMA_NAME"] = schema
+                text_columns = REPORT_SAVE_COLUMNS[:15]
+                staged[text_columns] = staged[text_columns].astype(object).where(staged[text_columns].notna(), "").astype(str)
+                staged["IS_ACTIVE"] = staged["IS_ACTIVE"].fillna(0).astype(int)
+                staged["VERSION"] = staged["VERSION"].fillna(1).astype(int)
+                staged["ID"] = staged["ID"].astype(int)
+
+                # Upload the rows into a session-scoped staging table instead of inlining them as SQL literals
+                session.write_pandas(
+                    staged.reset_index(drop=True),
+                    REPORT_STAGE_TABLE,
+                    database="DEV_DB_MANAGER",
+                    schema="MASKING",
+                    auto_create_table=True,
+                    overwrite=True,
+                    table_type="temporary",
+                )
                 merge_sql = f"""
                     MERGE INTO DEV_DB_MANAGER.MASKING.CLASSIFICATION_REPORT_V1 AS target
-                    USING (
-                        SELECT * FROM VALUES
-                        {values_str}
-                        AS source (
-                            DATABASE_NAME, SCHEMA_NAME, CLASSIFICATION_OWNER, DATE,
-                            TABLE_NAME, COLUMN_NAME, CLASSIFICATION, HIPAA_CLASS,
-                            MASKED, BU_APPROVAL_STATUS, BU_COMMENTS, BU_ASSIGNEE,
-                            INFOSEC_APPROVAL_STATUS, INFOSEC_APPROVER, INFOSEC_COMMENTS,
-                            IS_ACTIVE, VERSION, ID
-                        )
-                    ) AS source
+                    USING DEV_DB_MANAGER.MASKING.{REPORT_STAGE_TABLE} AS source
                     ON target.ID = source.ID
                     WHEN MATCHED THEN UPDATE SET
                         DATE = source.DATE,
@@ -1391,14 +2740,135 @@ if app_mode == "Classifications":
                         source.IS_ACTIVE, source.VERSION, source.ID
                     )
                 """
-                session.sql(merge_sql).collect()
-                st.session_state.last_save_time = time.time()
+                execute_sql(merge_sql, f"Auto-save MERGE ({len(staged)} rows)", session)
                 return True
             except Exception as e:
                 if show_message:
                     st.error(f"Error auto-saving classification report: {e}")
                 return False
 
+        # Auto-save coalesces edits and flushes them from a background thread once the window
+        # has passed since the first pending edit or enough rows are waiting
+        AUTO_SAVE_WINDOW_SECONDS = 5
+        AUTO_SAVE_MAX_PENDING_ROWS = 50
+        AUTO_SAVE_IDLE_POLL_SECONDS = 0.5
+
+        # Function to create the auto-save queue for the report being edited
+        def new_auto_save_queue(database, schema):
+            return {
+                "database": database,
+                "schema": schema,
+                "pending": {},  # report ID -> latest edited row
+                "pending_since": None,
+                "flush_now": False,
+                "saved_rows": 0,
+                "last_saved_at": 0,
+                "error": None,
+                "worker": None,
+                "lock": threading.Lock(),
+            }
+
+        def _ensure_auto_save_worker(queue):
+            """Start a flusher if rows are pending and none is running; call with the queue lock held."""
+            if queue["pending"] and queue["worker"] is None:
+                queue["worker"] = threading.Thread(
+                    target=_auto_save_worker, args=(queue, get_active_session()), daemon=True
+                )
+                queue["worker"].start()
+
+        def _auto_save_worker(queue, session):
+            while True:
+                with queue["lock"]:
+                    if not queue["pending"]:
+                        queue["worker"] = None
+                        return
+                    due = (
+                        queue["flush_now"]
+                        or len(queue["pending"]) >= AUTO_SAVE_MAX_PENDING_ROWS
+                        or time.time() - queue["pending_since"] >= AUTO_SAVE_WINDOW_SECONDS
+                    )
+                    if due:
+                        batch, queue["pending"], queue["pending_since"] = queue["pending"], {}, None
+                if not due:
+                    time.sleep(AUTO_SAVE_IDLE_POLL_SECONDS)
+                    continue
+
+                saved, failed = batch, {}
+                if not save_classification_report(
+                    pd.DataFrame(list(batch.values())), queue["database"], queue["schema"],
+                    show_message=False, session=session,
+                ):
+                    # Save row by row so one bad row cannot hold back the rest of the batch
+                    saved, failed = {}, {}
+                    for row_id, row in batch.items():
+                        row_saved = len(batch) > 1 and save_classification_report(
+                            pd.DataFrame([row]), queue["database"], queue["schema"],
+                            show_message=False, session=session,
+                        )
+                        (saved if row_saved else failed)[row_id] = row
+                with queue["lock"]:
+                    if saved:
+                        queue["saved_rows"] += len(saved)
+                        queue["last_saved_at"] = time.time()
+                    if not failed:
+                        queue["error"] = None
+                        continue
+                    # Requeue the failed rows for the next window; a newer edit of the same row wins
+                    for row_id, row in failed.items():
+                        queue["pending"].setdefault(row_id, row)
+                    queue["pending_since"] = queue["pending_since"] or time.time()
+                    queue["error"] = (
+                        f"Auto-save failed for report ID(s) {', '.join(sorted(failed))}; "
+                        f"{len(queue['pending'])} row(s) will be retried."
+                    )
+                    if queue["flush_now"]:
+                        # Hand the failure back to the waiting flush instead of retrying in a loop
+                        queue["worker"] = None
+                        return
+
+        # Function to queue edited rows for auto-save
+        def enqueue_auto_save(queue, rows):
+            with queue["lock"]:
+                for row in rows[rows["ID"].notna()].to_dict("records"):
+                    queue["pending"][str(row["ID"])] = row
+                if queue["pending_since"] is None:
+                    queue["pending_since"] = time.time()
+                _ensure_auto_save_worker(queue)
+
+        # Function to save everything still queued and wait for it; returns True when nothing is left pending
+        def flush_auto_save_queue(queue):
+            with queue["lock"]:
+                queue["flush_now"] = True
+                _ensure_auto_save_worker(queue)
+                worker = queue["worker"]
+            if worker is not None:
+                worker.join()
+            with queue["lock"]:
+                queue["flush_now"] = False
+                return not queue["pending"]
+
+        REPORT_APPROVAL_STATUSES = ['MASK', 'APPROVED', 'NO MASKING NEEDED']
+
+        # Function to give the report the dtypes the data editor works with; idempotent
+        def prepare_report_frame(df):
+            for column in ("BU_APPROVAL_STATUS", "INFOSEC_APPROVAL_STATUS"):
+                df[column] = df[column].astype('category').cat.set_categories(REPORT_APPROVAL_STATUSES)
+            return df
+
+        # Function to hash report rows; every kind of missing value (None, NaN, NA) hashes alike
+        def _report_hashes(df):
+            text = df.astype(object).where(df.notna(), None).astype(str)
+            return zip(df["ID"].astype(str), pd.util.hash_pandas_object(text, index=False))
+
+        # Function to fingerprint report rows by ID so auto-save can tell which rows were edited
+        def report_row_hashes(df):
+            return dict(_report_hashes(df))
+
+        # Function to pick the rows that differ from the snapshot last handed to auto-save
+        def changed_report_rows(df):
+            saved_hashes = st.session_state.saved_row_hashes
+            return df[[saved_hashes.get(row_id) != row_hash for row_id, row_hash in _report_hashes(df)]]
+
         def insert_raw_classification_details(database, schema, bu_name):
             session = get_active_session()
 
@@ -1421,156 +2891,246 @@ if app_mode == "Classifications":
                 st.error("Invalid BU Name selected. Please select a valid BU.")
                 return False
 
-            # Determine the maximum version for the specific combination of database, schema, and classification owner
-            max_version_row = session.sql(f"""
-                SELECT MAX(VERSION) 
-                FROM DEV_DB_MANAGER.MASKING.RAW_CLASSIFICATION_DETAILS 
-                WHERE DATABASE_NAME = '{database}' 
-                    AND SCHEMA_NAME = '{schema}' 
-                    AND CLASSIFICATION_OWNER = '{classification_owner}'
-            """).first()
-
-            max_version = max_version_row[0] if max_version_row[0] is not None else 0
-            new_version = max_version + 1  # Increment the version for the insert
-
-            fetch_sql = f"""
+            # Approved rows of the latest report version
+            approved_report_sql = """
                 SELECT * 
                 FROM DEV_DB_MANAGER.MASKING.CLASSIFICATION_REPORT_V1
-                WHERE DATABASE_NAME = '{database}' 
-                    AND SCHEMA_NAME = '{schema}' 
+                WHERE DATABASE_NAME = ? 
+                    AND SCHEMA_NAME = ? 
                     AND VERSION = (
                         SELECT MAX(VERSION)
                         FROM DEV_DB_MANAGER.MASKING.CLASSIFICATION_REPORT_V1
-                        WHERE DATABASE_NAME = '{database}' 
-                            AND SCHEMA_NAME = '{schema}'
+                        WHERE DATABASE_NAME = ? 
+                            AND SCHEMA_NAME = ?
                     )
                     AND ((BU_APPROVAL_STATUS = 'APPROVED' AND MASKED = 'YES') 
                     OR (BU_APPROVAL_STATUS = 'MASK' AND MASKED = 'NO'))
             """
-            classification_details = session.sql(fetch_sql).collect()
-
-            if not classification_details:
-                st.warning("No classification details available for insertion.")
-                return False
+            approved_report_params = [database, schema, database, schema]
+
+            # One MERGE allocates the import ID and version, inserts the full approved set as the new
+            # import and deactivates the owner's previous rows, and does nothing when every approved
+            # row is already active with identical details. Being a single statement it is atomic on
+            # its own, so no transaction is opened on the session the background writers share.
+            # The new import carries unchanged rows too, because readers take the latest
+            # IMPORT_ID / active rows as the complete classification.
+            submission_sql = f"""
+                MERGE INTO DEV_DB_MANAGER.MASKING.RAW_CLASSIFICATION_DETAILS d
+                USING (
+                    WITH approved AS ({approved_report_sql}),
+                    submission AS (
+                        SELECT
+                            COALESCE(MAX(IMPORT_ID), 0) + 1 AS IMPORT_ID,
+                            COALESCE(MAX(IFF(DATABASE_NAME = ?
+                                             AND SCHEMA_NAME = ?
+                                             AND CLASSIFICATION_OWNER = ?, VERSION, NULL)), 0) + 1 AS VERSION
+                        FROM DEV_DB_MANAGER.MASKING.RAW_CLASSIFICATION_DETAILS
+                    ),
+                    -- One row when an approved row is not already active with identical details
+                    changed AS (
+                        SELECT 1 AS CHANGED
+                        FROM approved r
+                        WHERE NOT EXISTS (
+                            SELECT 1
+                            FROM DEV_DB_MANAGER.MASKING.RAW_CLASSIFICATION_DETAILS p
+                            WHERE p.DATABASE_NAME = ?
+                                AND p.SCHEMA_NAME = ?
+                                AND p.CLASSIFICATION_OWNER = ?
+                                AND p.HIPAA_CLASS = ?
+                                AND p.IS_ACTIVE = TRUE
+                                AND EQUAL_NULL(p.TABLE_NAME, r.TABLE_NAME)
+                                AND EQUAL_NULL(p.COLUMN_NAME, r.COLUMN_NAME)
+                                AND EQUAL_NULL(p.BU_APPROVAL_STATUS, r.BU_APPROVAL_STATUS)
+                                AND EQUAL_NULL(p.BU_COMMENTS, r.BU_COMMENTS)
+                                AND EQUAL_NULL(p.BU_ASSIGNEE, r.BU_ASSIGNEE)
+                                AND EQUAL_NULL(p.INFOSEC_APPROVAL_STATUS, r.INFOSEC_APPROVAL_STATUS)
+                                AND EQUAL_NULL(p.INFOSEC_APPROVER, r.INFOSEC_APPROVER)
+                                AND EQUAL_NULL(p.INFOSEC_COMMENTS, r.INFOSEC_COMMENTS)
+                        )
+                        LIMIT 1
+                    )
+                    -- A single DEACTIVATE row matches every previous row of the owner
+                    SELECT
+                        'DEACTIVATE' AS ACTION, NULL AS IMPORT_ID, NULL AS DATE,
+                        NULL AS DATABASE_NAME, NULL AS SCHEMA_NAME, NULL AS TABLE_NAME, NULL AS COLUMN_NAME,
+                        NULL AS HIPAA_CLASS, NULL AS BU_APPROVAL_STATUS, NULL AS BU_COMMENTS,
+                        NULL AS BU_ASSIGNEE, NULL AS INFOSEC_APPROVAL_STATUS, NULL AS INFOSEC_APPROVER,
+                        NULL AS INFOSEC_COMMENTS, NULL AS CLASSIFICATION_OWNER, NULL AS VERSION
+                    FROM changed
+                    UNION ALL
+                    SELECT
+                        'INSERT', s.IMPORT_ID, r.DATE,
+                        ?, ?, r.TABLE_NAME, r.COLUMN_NAME,
+                        ?, r.BU_APPROVAL_STATUS, r.BU_COMMENTS,
+                        r.BU_ASSIGNEE, r.INFOSEC_APPROVAL_STATUS, r.INFOSEC_APPROVER,
+                        r.INFOSEC_COMMENTS, ?, s.VERSION
+                    FROM approved r
+                    CROSS JOIN submission s
+                    WHERE EXISTS (SELECT 1 FROM changed)
+                ) src
+                ON src.ACTION = 'DEACTIVATE'
+                    AND d.DATABASE_NAME = ?
+                    AND d.SCHEMA_NAME = ?
+                    AND d.CLASSIFICATION_OWNER = ?
+                WHEN MATCHED AND d.IS_ACTIVE THEN UPDATE SET IS_ACTIVE = false
+                WHEN NOT MATCHED AND src.ACTION = 'INSERT' THEN INSERT (
+                    IMPORT_ID, DATE, DATABASE_NAME, SCHEMA_NAME, TABLE_NAME, COLUMN_NAME, 
+                    CLASSIFICATION, HIPAA_CLASS, BU_APPROVAL_STATUS, BU_COMMENTS, 
+                    BU_ASSIGNEE, INFOSEC_APPROVAL_STATUS, INFOSEC_APPROVER, 
+                    INFOSEC_COMMENTS, IS_ACTIVE, CLASSIFICATION_OWNER, VERSION
+                )
+                VALUES (
+                    src.IMPORT_ID, src.DATE, src.DATABASE_NAME, src.SCHEMA_NAME,
+                    src.TABLE_NAME, src.COLUMN_NAME, 'HIPAA',
+                    src.HIPAA_CLASS, src.BU_APPROVAL_STATUS, src.BU_COMMENTS,
+                    src.BU_ASSIGNEE, src.INFOSEC_APPROVAL_STATUS,
+                    src.INFOSEC_APPROVER, src.INFOSEC_COMMENTS,
+                    true, src.CLASSIFICATION_OWNER, src.VERSION
+                )
+            """
 
-            insert_values = []
-            duplicate_count = 0  # Counter for duplicate records
-
-            for row in classification_details:
-                # Check for existing records to prevent duplicates
-                existing_record_check = session.sql(f"""
-                    SELECT COUNT(*) 
-                    FROM DEV_DB_MANAGER.MASKING.RAW_CLASSIFICATION_DETAILS
-                    WHERE DATABASE_NAME = '{database}'
-                        AND SCHEMA_NAME = '{schema}'
-                        AND CLASSIFICATION_OWNER = '{classification_owner}'
-                        AND TABLE_NAME = '{row['TABLE_NAME']}'
-                        AND COLUMN_NAME = '{row['COLUMN_NAME']}'
-                        AND HIPAA_CLASS = '{hipaa_class}'
-                        AND BU_APPROVAL_STATUS = '{row['BU_APPROVAL_STATUS']}'
-                        AND BU_COMMENTS = '{row['BU_COMMENTS']}'
-                        AND BU_ASSIGNEE = '{row['BU_ASSIGNEE']}'
-                        AND INFOSEC_APPROVAL_STATUS = '{row['INFOSEC_APPROVAL_STATUS']}'
-                        AND INFOSEC_APPROVER = '{row['INFOSEC_APPROVER']}'
-                        AND INFOSEC_COMMENTS = '{row['INFOSEC_COMMENTS']}'
-                        AND IS_ACTIVE = TRUE
-                """).first()[0]
-
-                if existing_record_check > 0:
-                    duplicate_count += 1  # Increment the duplicate counter
-                    continue
+            try:
+                inserted_count = execute_sql(submission_sql, "Submission: merge new details", session, params=[
+                    *approved_report_params,
+                    database, schema, classification_owner,
+                    database, schema, classification_owner, hipaa_class,
+                    database, schema, hipaa_class, classification_owner,
+                    database, schema, classification_owner,
+                ])[0][0]
+                if inserted_count > 0:
+                    invalidate_classification_owners()
+                    return True
 
-                max_import_id_row = session.sql("SELECT MAX(IMPORT_ID) FROM DEV_DB_MANAGER.MASKING.RAW_CLASSIFICATION_DETAILS").first()
-                max_import_id = max_import_id_row[0] if max_import_id_row[0] is not None else 0
-                new_import_id = max_import_id + 1
-
-                # Mark existing records as inactive
-                session.sql(f"""
-                    UPDATE DEV_DB_MANAGER.MASKING.RAW_CLASSIFICATION_DETAILS
-                    SET IS_ACTIVE = false
-                    WHERE DATABASE_NAME = '{database}'
-                        AND SCHEMA_NAME = '{schema}'
-                        AND CLASSIFICATION_OWNER = '{classification_owner}'
-                """).collect()
-
-                insert_values.append(f"""(
-                    {new_import_id}, '{row['DATE']}', '{database}', '{schema}', 
-                    '{row['TABLE_NAME']}', '{row['COLUMN_NAME']}', 'HIPAA', 
-                    '{hipaa_class}', '{row['BU_APPROVAL_STATUS']}', '{row['BU_COMMENTS']}', 
-                    '{row['BU_ASSIGNEE']}', '{row['INFOSEC_APPROVAL_STATUS']}', 
-                    '{row['INFOSEC_APPROVER']}', '{row['INFOSEC_COMMENTS']}', 
-                    true, '{classification_owner}', {new_version}
-                )""")
-
-            if insert_values:
-                values_str = ",\n".join(insert_values)
-                insert_sql = f"""
-                    INSERT INTO DEV_DB_MANAGER.MASKING.RAW_CLASSIFICATION_DETAILS (
-                        IMPORT_ID, DATE, DATABASE_NAME, SCHEMA_NAME, TABLE_NAME, COLUMN_NAME, 
-                        CLASSIFICATION, HIPAA_CLASS, BU_APPROVAL_STATUS, BU_COMMENTS, 
-                        BU_ASSIGNEE, INFOSEC_APPROVAL_STATUS, INFOSEC_APPROVER, 
-                        INFOSEC_COMMENTS, IS_ACTIVE, CLASSIFICATION_OWNER, VERSION
-                    ) VALUES {values_str}
-                """
+                # Nothing changed: every approved row is already active with identical details
+                duplicate_count = execute_sql(
+                    f"SELECT COUNT(*) FROM ({approved_report_sql})", "Submission: count approved rows", session,
+                    params=approved_report_params,
+                )[0][0]
+            except Exception as e:
+                st.error(f"Error inserting into RAW_CLASSIFICATION_DETAILS: {e}")
+                return False
 
-                try:
-                    session.sql(insert_sql).collect()
-                    return True
-                except Exception as e:
-                    st.error(f"Error inserting into RAW_CLASSIFICATION_DETAILS: {e}")
-                    return False
+            if duplicate_count == 0:
+                st.warning("No classification details available for insertion.")
             else:
                 # Show a consolidated duplicate message
-                if duplicate_count > 0:
-                    st.info(f"{duplicate_count} records already exist for the specified classification criteria. Skipping these entries.")
-                else:
-                    st.info("No new records to insert.")
-                return False
+                st.info(f"{duplicate_count} records already exist for the specified classification criteria. Skipping these entries.")
+            return False
 
         # Function to fetch distinct BU names
         def get_bu_names():
-            session = get_active_session()
-            rows = session.sql("SELECT DISTINCT BU_NAME FROM DEV_DB_MANAGER.MASKING.CONSUMER").collect()
-            return [row[0] for row in rows]
+            return fetch_column(sql_statement("bu_names", manager_database=manager_database("DEV")), "BU names")
 
         # UI for classification report editing
         st.title("Classification Report Editor")
 
-        database = st.selectbox("Select Database", fetch_databases())
+        database = st.selectbox("Select Database", get_databases("PROD"))
         if database:
-            schema = st.selectbox("Select Schema", fetch_schemas(database))
+            schema = st.selectbox("Select Schema", get_schemas(database))
             if schema and st.button("Get Classification Report"):
-                data = fetch_classification_report(database, schema)
-                if data:
-                    df = pd.DataFrame([row.as_dict() for row in data])
+                report_classifications = get_report_classifications(database, schema)
+                if report_classifications:
                     # Get current user
                     try:
-                        current_user = get_active_session().sql("SELECT CURRENT_USER()").collect()[0][0]
+                        current_user = execute_sql("SELECT CURRENT_USER()", "Current user")[0][0]
                     except:
                         current_user = get_active_session().get_current_user()
-                    # Replace BU_ASSIGNEE with current user
-                    df['BU_ASSIGNEE'] = current_user
-                    st.session_state.edited_df = df.copy()
+                    # Finish saving the previous report before its queue is replaced
+                    if st.session_state.auto_save_queue is not None:
+                        flush_auto_save_queue(st.session_state.auto_save_queue)
+                    st.session_state.auto_save_queue = new_auto_save_queue(database, schema)
+                    st.session_state.report_scope = {
+                        "database": database,
+                        "schema": schema,
+                        "assignee": current_user,
+                        "classifications": list(report_classifications),
+                    }
+                    st.session_state.report_filter_key = None
+                    st.session_state.report_page_key = None
                     st.session_state.report_fetched = True
-                    st.session_state.auto_save_key += 1  # Increment key to reset data_editor
                 else:
                     st.warning("No data found for the selected database and schema.")
 
+        # Filters, sorting and paging for the fetched report
+        if st.session_state.report_fetched and st.session_state.report_scope is not None:
+            report_scope = st.session_state.report_scope
+            filter_col1, filter_col2, filter_col3, filter_col4 = st.columns(4)
+            with filter_col1:
+                table_filter = st.text_input("Table name contains", key="report_table_filter")
+            with filter_col2:
+                classification_filter = st.multiselect("Classification", report_scope["classifications"], key="report_classification_filter")
+            with filter_col3:
+                approval_filter = st.multiselect("BU Approval Status", REPORT_APPROVAL_STATUSES, key="report_approval_filter")
+            with filter_col4:
+                masked_filter = st.selectbox("Masked", ["All", "YES", "NO"], key="report_masked_filter")
+            sort_col1, sort_col2, sort_col3 = st.columns(3)
+            with sort_col1:
+                sort_column = st.selectbox("Sort by", REPORT_SORT_COLUMNS, key="report_sort_column")
+            with sort_col2:
+                sort_descending = st.checkbox("Descending", key="report_sort_descending")
+            with sort_col3:
+                page_size = st.selectbox("Rows per page", REPORT_PAGE_SIZES, key="report_page_size")
+
+            report_filters = {
+                "table_name": table_filter.strip(),
+                "classifications": classification_filter,
+                "approval_statuses": approval_filter,
+                "masked": None if masked_filter == "All" else masked_filter,
+            }
+            # Recount only when the report or the filters change; a new version also resets the page number
+            filter_key = repr((report_scope["database"], report_scope["schema"], report_filters))
+            if filter_key != st.session_state.report_filter_key:
+                st.session_state.report_total_rows = count_classification_report(
+                    report_scope["database"], report_scope["schema"], report_filters
+                )
+                st.session_state.report_filter_key = filter_key
+                st.session_state.report_filter_version += 1
+            total_rows = st.session_state.report_total_rows
+            page_count = max(1, (total_rows + page_size - 1) // page_size)
+            page_number = st.number_input(
+                "Page", min_value=1, max_value=page_count, value=1,
+                key=f"report_page_{st.session_state.report_filter_version}",
+            )
+            st.caption(f"{total_rows} matching rows · page {page_number} of {page_count}")
+
+            page_key = (filter_key, sort_column, sort_descending, page_size, page_number)
+            if page_key != st.session_state.report_page_key:
+                # Queued edits on the current page have to land before the next page is read
+                flush_auto_save_queue(st.session_state.auto_save_queue)
+                df = fetch_classification_report(
+                    report_scope["database"], report_scope["schema"], report_filters,
+                    sort_column, sort_descending, page_size, page_number,
+                )
+                # Replace BU_ASSIGNEE with current user
+                df['BU_ASSIGNEE'] = report_scope["assignee"]
+                # Snapshot the frame exactly as the editor will get it, so unedited rows hash the same
+                df = prepare_report_frame(df)
+                st.session_state.edited_df = df.copy()
+                st.session_state.saved_row_hashes = report_row_hashes(df)
+                st.session_state.report_page_key = page_key
+                st.session_state.auto_save_key += 1  # Increment key to reset data_editor
+
         # Editable DataFrame with auto-save
         if st.session_state.report_fetched and st.session_state.edited_df is not None:
             st.subheader("Edit Classification Report (Auto-Save Enabled)")
             
-            # Display last save time
-            if st.session_state.last_save_time > 0:
-                last_save_str = time.strftime("%H:%M:%S", time.localtime(st.session_state.last_save_time))
-                st.caption(f"Last auto-saved at: {last_save_str}")
+            # Display last save time and queue state
+            auto_save_queue = st.session_state.auto_save_queue
+            with auto_save_queue["lock"]:
+                pending_rows = len(auto_save_queue["pending"])
+                saved_rows = auto_save_queue["saved_rows"]
+                last_saved_at = auto_save_queue["last_saved_at"]
+                auto_save_error = auto_save_queue["error"]
+            if last_saved_at > 0:
+                last_save_str = time.strftime("%H:%M:%S", time.localtime(last_saved_at))
+                st.caption(f"Last auto-saved at: {last_save_str} · {pending_rows} pending · {saved_rows} saved")
+            elif pending_rows:
+                st.caption(f"{pending_rows} pending")
+            if auto_save_error:
+                st.warning(auto_save_error)
 
             # Ensure the relevant columns are treated as categories with specific options
-            st.session_state.edited_df['BU_APPROVAL_STATUS'] = st.session_state.edited_df['BU_APPROVAL_STATUS'].astype('category')
-            st.session_state.edited_df['BU_APPROVAL_STATUS'] = st.session_state.edited_df['BU_APPROVAL_STATUS'].cat.set_categories(['MASK', 'APPROVED', 'NO MASKING NEEDED'])
-
-            st.session_state.edited_df['INFOSEC_APPROVAL_STATUS'] = st.session_state.edited_df['INFOSEC_APPROVAL_STATUS'].astype('category')
-            st.session_state.edited_df['INFOSEC_APPROVAL_STATUS'] = st.session_state.edited_df['INFOSEC_APPROVAL_STATUS'].cat.set_categories(['MASK', 'APPROVED', 'NO MASKING NEEDED'])
+            prepare_report_frame(st.session_state.edited_df)
 
             # Create the data editor with full screen height and auto-save
             # Use columns to maximize width usage
@@ -1578,7 +3138,7 @@ if app_mode == "Classifications":
             with col2:
                 edited_df = st.data_editor(
                     st.session_state.edited_df, 
-                    num_rows="dynamic", 
+                    num_rows="fixed",  # Rows are saved by report ID, so new rows cannot be added here
                     use_container_width=True,
                     height=1000,  # Maximum height for better full-screen experience
                     key=f"data_editor_{st.session_state.auto_save_key}"
@@ -1589,19 +3149,47 @@ if app_mode == "Classifications":
                 # Update session state with new data
                 st.session_state.edited_df = edited_df.copy()
                 
-                # Auto-save the changes
-                success = save_classification_report(edited_df, database, schema, show_message=False)
-                
-                if success:
+                # Queue only the rows edited since they were last queued; the background flusher saves them
+                changed_rows = changed_report_rows(edited_df)
+                if not changed_rows.empty:
+                    enqueue_auto_save(auto_save_queue, changed_rows)
+                    st.session_state.saved_row_hashes.update(report_row_hashes(changed_rows))
                     # Show a subtle auto-save indicator with fixed position
                     st.markdown(
-                        '<div class="auto-save-status">✅ Auto-saved</div>',
+                        f'<div class="auto-save-status">✅ {len(changed_rows)} change(s) queued for auto-save</div>',
                         unsafe_allow_html=True
                     )
 
             st.subheader("Submit Classifications")
             bu_name = st.selectbox("Select BU Name", get_bu_names())
             if bu_name and st.button("Submit Classifications"):
-                success = insert_raw_classification_details(database, schema, bu_name)
-                if success:
-                    st.success("Classification details inserted successfully!")
\ No newline at end of file
+                # The submission reads the saved report, so every queued edit has to land first
+                if not flush_auto_save_queue(auto_save_queue):
+                    st.error(f"{auto_save_queue['error']} Submit again once the edits are saved.")
+                elif insert_raw_classification_details(database, schema, bu_name):
+                    st.success("Classification details inserted successfully!")
+
+# Query timing panel, drawn last so it includes this run's statements
+with st.sidebar.expander("Query Timings"):
+    st.toggle("Compare with collect()", key="fetch_compare_collect")
+    session_id = metrics_session_id()
+    with _query_metrics()["lock"]:
+        recorded_runs = {record["RUN_ID"]: record["RUN_LABEL"] for record in _query_metrics()["records"]
+                         if record["SESSION_ID"] == session_id}
+    if recorded_runs:
+        # Most recent run first
+        run_ids = list(recorded_runs)[::-1]
+        selected_run_id = st.selectbox("Run", run_ids, format_func=recorded_runs.get, key="timing_run")
+        run_metrics = query_metrics_dataframe(selected_run_id)
+        st.caption(
+            f"{len(run_metrics)} statements · {run_metrics['ELAPSED_SECONDS'].sum():.2f}s total · "
+            f"slowest: {run_metrics.loc[run_metrics['ELAPSED_SECONDS'].idxmax(), 'STEP']}"
+        )
+        st.dataframe(run_metrics, use_container_width=True)
+    else:
+        st.caption("No queries recorded yet.")
+
+# Write whatever this run audited; a failed write is retried on the next flush. Query metrics
+# are flushed by record_query once enough have accumulated.
+if not flush_audit_events():
+    st.sidebar.warning(f"❌ Error logging to audit: {_audit_buffer()['last_error']}", icon="🚨")
@@ -3,113 +3,173 @@ RETURNS VARCHAR
 LANGUAGE SQL
 EXECUTE AS OWNER
 AS '
+DECLARE
+    rows_inserted INTEGER DEFAULT 0;
+    rows_updated INTEGER DEFAULT 0;
+    rows_deleted INTEGER DEFAULT 0;
+    rows_deduplicated INTEGER DEFAULT 0;
 BEGIN
-    -- Conditional delete based on table_name using CASE statement
-    -- Modified: Remove records based on DATABASE and SCHEMA only (not CLASSIFICATION_OWNER)
-    EXECUTE IMMEDIATE 
-    CASE 
-        WHEN table_name = ''DEV_DB_MANAGER.MASKING.RAW_CLASSIFICATION_DETAILS'' THEN 
-            ''DELETE FROM DEV_DB_MANAGER.MASKING.CLASSIFICATION_DETAILS
-            WHERE DATABASE = '''''' || db_name || ''''''
-              AND SCHEMA = '''''' || schema_name || '''''';''
-        ELSE 
-            ''SELECT 1;'' 
-    END;
+    IF (table_name = ''DEV_DB_MANAGER.MASKING.RAW_CLASSIFICATION_DETAILS'') THEN
+        -- Incremental sync of the (DATABASE, SCHEMA) slice instead of deleting and reinserting it:
+        -- only (TABLE, COLUMN) rows whose classification changed are written
+        -- Drop every target row of a (TABLE, COLUMN) key that is loaded more than once, so the MERGE
+        -- below matches at most one row per key; keys still classified in the source are re-inserted,
+        -- so these rows are counted apart from the deletes
+        DELETE FROM DEV_DB_MANAGER.MASKING.CLASSIFICATION_DETAILS tgt
+        USING (
+            SELECT DATABASE, SCHEMA, "TABLE", "COLUMN"
+            FROM DEV_DB_MANAGER.MASKING.CLASSIFICATION_DETAILS
+            WHERE DATABASE = :db_name
+              AND SCHEMA = :schema_name
+            GROUP BY DATABASE, SCHEMA, "TABLE", "COLUMN"
+            HAVING COUNT(*) > 1
+        ) dup
+        WHERE tgt.DATABASE = dup.DATABASE
+          AND tgt.SCHEMA = dup.SCHEMA
+          AND tgt."TABLE" = dup."TABLE"
+          AND tgt."COLUMN" = dup."COLUMN";
+        rows_deduplicated := SQLROWCOUNT;
 
-    -- Insert new records with IS_ACTIVE = TRUE
-    -- Modified: Get latest record per database-schema combination regardless of classification_owner
-    EXECUTE IMMEDIATE ''
-    INSERT INTO DEV_DB_MANAGER.MASKING.CLASSIFICATION_DETAILS (
-        DATE,
-        DATABASE,
-        SCHEMA,
-        "TABLE",
-        "COLUMN",
-        CLASSIFICATION,
-        TAG,
-        IS_ACTIVE,
-        CLASSIFICATION_OWNER
-    )
-    SELECT 
-        DATE,
-        DATABASE,
-        SCHEMA,
-        "TABLE",
-        "COLUMN",
-        CLASSIFICATION,
-        TAG,
-        '' || 
-        CASE 
-            WHEN table_name = ''ALTR_DSAAS_DB.PUBLIC.CLASSIFICATION_DETAILS'' THEN ''TRUE'' 
-            ELSE ''IS_ACTIVE'' 
-        END || '' AS IS_ACTIVE,
-        '' || 
-        CASE 
-            WHEN table_name = ''ALTR_DSAAS_DB.PUBLIC.CLASSIFICATION_DETAILS'' THEN ''''''ALTR'''''' 
-            ELSE ''CLASSIFICATION_OWNER'' 
-        END || '' AS CLASSIFICATION_OWNER
-    FROM (
-        SELECT 
+        -- Modified: Get latest record per database-schema combination regardless of classification_owner
+        MERGE INTO DEV_DB_MANAGER.MASKING.CLASSIFICATION_DETAILS tgt
+        USING (
+            SELECT
+                DATE,
+                DATABASE,
+                SCHEMA,
+                "TABLE",
+                "COLUMN",
+                CLASSIFICATION,
+                TAG,
+                IS_ACTIVE,
+                CLASSIFICATION_OWNER
+            FROM DEV_DB_MANAGER.MASKING.RAW_CLASSIFICATION_DETAILS
+            WHERE DATABASE = :db_name
+              AND SCHEMA = :schema_name
+              AND IS_ACTIVE = TRUE
+              AND TAG IS NOT NULL
+            -- Keep only the latest record for each (DATABASE, SCHEMA, TABLE, COLUMN)
+            QUALIFY ROW_NUMBER() OVER (
+                PARTITION BY DATABASE, SCHEMA, "TABLE", "COLUMN"
+                ORDER BY DATE DESC,
+                CASE WHEN CLASSIFICATION_OWNER = :classification_owner THEN 1 ELSE 2 END
+            ) = 1
+        ) src
+        ON tgt.DATABASE = src.DATABASE
+            AND tgt.SCHEMA = src.SCHEMA
+            AND tgt."TABLE" = src."TABLE"
+            AND tgt."COLUMN" = src."COLUMN"
+        WHEN MATCHED AND (
+            tgt.CLASSIFICATION IS DISTINCT FROM src.CLASSIFICATION
+            OR tgt.TAG IS DISTINCT FROM src.TAG
+            OR tgt.IS_ACTIVE IS DISTINCT FROM src.IS_ACTIVE
+            OR tgt.CLASSIFICATION_OWNER IS DISTINCT FROM src.CLASSIFICATION_OWNER
+        ) THEN UPDATE SET
+            DATE = src.DATE,
+            CLASSIFICATION = src.CLASSIFICATION,
+            TAG = src.TAG,
+            IS_ACTIVE = src.IS_ACTIVE,
+            CLASSIFICATION_OWNER = src.CLASSIFICATION_OWNER
+        WHEN NOT MATCHED THEN INSERT (
             DATE,
             DATABASE,
             SCHEMA,
             "TABLE",
             "COLUMN",
-            '' || 
-            CASE 
-                WHEN table_name = ''ALTR_DSAAS_DB.PUBLIC.CLASSIFICATION_DETAILS'' THEN ''GDLP_CLASSIFICATION'' 
-                ELSE ''CLASSIFICATION'' 
-            END || '' AS CLASSIFICATION,
-            '' || 
-            CASE 
-                WHEN table_name = ''ALTR_DSAAS_DB.PUBLIC.CLASSIFICATION_DETAILS'' THEN ''MAPPED_TAG'' 
-                ELSE ''TAG'' 
-            END || '' AS TAG,
-            '' || 
-            CASE 
-                WHEN table_name = ''ALTR_DSAAS_DB.PUBLIC.CLASSIFICATION_DETAILS'' THEN ''TRUE'' 
-                ELSE ''IS_ACTIVE'' 
-            END || '' AS IS_ACTIVE,
-            '' || 
-            CASE 
-                WHEN table_name = ''ALTR_DSAAS_DB.PUBLIC.CLASSIFICATION_DETAILS'' THEN ''''''ALTR'''''' 
-                ELSE ''CLASSIFICATION_OWNER'' 
-            END || '' AS CLASSIFICATION_OWNER,
-            ROW_NUMBER() OVER (
-                PARTITION BY DATABASE, SCHEMA, "TABLE", "COLUMN" 
-                ORDER BY DATE DESC, 
-                CASE 
-                    WHEN '' || 
-                    CASE 
-                        WHEN table_name = ''ALTR_DSAAS_DB.PUBLIC.CLASSIFICATION_DETAILS'' THEN ''''''ALTR'''''' 
-                        ELSE ''CLASSIFICATION_OWNER'' 
-                    END || '' = '''''' || classification_owner || '''''' THEN 1 
-                    ELSE 2 
-                END
-            ) AS rn
-        FROM '' || table_name || ''
-        WHERE DATABASE = '''''' || db_name || ''''''
-          AND SCHEMA = '''''' || schema_name || ''''''
-          AND IS_ACTIVE = TRUE
-          AND '' || 
-          CASE 
-              WHEN table_name = ''ALTR_DSAAS_DB.PUBLIC.CLASSIFICATION_DETAILS'' THEN ''MAPPED_TAG != ''''NO MAPPING'''''' 
-              ELSE ''TAG IS NOT NULL'' 
-          END || ''
-    ) src
-    WHERE src.rn = 1 -- Keep only the latest record for each (DATABASE, SCHEMA, TABLE, COLUMN)
-      AND NOT EXISTS (
-        SELECT 1
-        FROM DEV_DB_MANAGER.MASKING.CLASSIFICATION_DETAILS tgt
-        WHERE src.DATABASE = tgt.DATABASE
-          AND src.SCHEMA = tgt.SCHEMA
-          AND src."TABLE" = tgt."TABLE"
-          AND src."COLUMN" = tgt."COLUMN"
-          AND src.CLASSIFICATION = tgt.CLASSIFICATION
-          AND src.TAG = tgt.TAG
-    )
-    '';
+            CLASSIFICATION,
+            TAG,
+            IS_ACTIVE,
+            CLASSIFICATION_OWNER
+        ) VALUES (
+            src.DATE,
+            src.DATABASE,
+            src.SCHEMA,
+            src."TABLE",
+            src."COLUMN",
+            src.CLASSIFICATION,
+            src.TAG,
+            src.IS_ACTIVE,
+            src.CLASSIFICATION_OWNER
+        );
+        SELECT $1, $2 INTO :rows_inserted, :rows_updated FROM TABLE(RESULT_SCAN(LAST_QUERY_ID()));
 
-    RETURN ''Data transfer completed successfully from table: '' || table_name;
+        -- Remove (TABLE, COLUMN) rows that are no longer classified in the source
+        -- Modified: Remove records based on DATABASE and SCHEMA only (not CLASSIFICATION_OWNER)
+        DELETE FROM DEV_DB_MANAGER.MASKING.CLASSIFICATION_DETAILS
+        WHERE DATABASE = :db_name
+          AND SCHEMA = :schema_name
+          AND NOT EXISTS (
+            SELECT 1
+            FROM DEV_DB_MANAGER.MASKING.RAW_CLASSIFICATION_DETAILS src
+            WHERE src.DATABASE = CLASSIFICATION_DETAILS.DATABASE
+              AND src.SCHEMA = CLASSIFICATION_DETAILS.SCHEMA
+              AND src."TABLE" = CLASSIFICATION_DETAILS."TABLE"
+              AND src."COLUMN" = CLASSIFICATION_DETAILS."COLUMN"
+              AND src.IS_ACTIVE = TRUE
+              AND src.TAG IS NOT NULL
+        );
+        rows_deleted := SQLROWCOUNT;
+
+    ELSEIF (table_name = ''ALTR_DSAAS_DB.PUBLIC.CLASSIFICATION_DETAILS'') THEN
+        -- ALTR results are only ever added: insert (TABLE, COLUMN, CLASSIFICATION, TAG) rows not loaded yet
+        MERGE INTO DEV_DB_MANAGER.MASKING.CLASSIFICATION_DETAILS tgt
+        USING (
+            SELECT
+                DATE,
+                DATABASE,
+                SCHEMA,
+                "TABLE",
+                "COLUMN",
+                GDLP_CLASSIFICATION AS CLASSIFICATION,
+                MAPPED_TAG AS TAG
+            FROM ALTR_DSAAS_DB.PUBLIC.CLASSIFICATION_DETAILS
+            WHERE DATABASE = :db_name
+              AND SCHEMA = :schema_name
+              AND IS_ACTIVE = TRUE
+              AND MAPPED_TAG != ''NO MAPPING''
+            -- Keep only the latest record for each (DATABASE, SCHEMA, TABLE, COLUMN)
+            QUALIFY ROW_NUMBER() OVER (
+                PARTITION BY DATABASE, SCHEMA, "TABLE", "COLUMN"
+                ORDER BY DATE DESC
+            ) = 1
+        ) src
+        ON tgt.DATABASE = src.DATABASE
+            AND tgt.SCHEMA = src.SCHEMA
+            AND tgt."TABLE" = src."TABLE"
+            AND tgt."COLUMN" = src."COLUMN"
+            AND tgt.CLASSIFICATION = src.CLASSIFICATION
+            AND tgt.TAG = src.TAG
+        WHEN NOT MATCHED THEN INSERT (
+            DATE,
+            DATABASE,
+            SCHEMA,
+            "TABLE",
+            "COLUMN",
+            CLASSIFICATION,
+            TAG,
+            IS_ACTIVE,
+            CLASSIFICATION_OWNER
+        ) VALUES (
+            src.DATE,
+            src.DATABASE,
+            src.SCHEMA,
+            src."TABLE",
+            src."COLUMN",
+            src.CLASSIFICATION,
+            src.TAG,
+            TRUE,
+            ''ALTR''
+        );
+        rows_inserted := SQLROWCOUNT;
+
+    ELSE
+        RETURN ''Unsupported source table: '' || table_name;
+    END IF;
+
+    RETURN ''Data transfer completed successfully from table: '' || table_name
+        || '' (inserted: '' || rows_inserted
+        || '', updated: '' || rows_updated
+        || '', deleted: '' || rows_deleted
+        || '', duplicate rows removed: '' || rows_deduplicated || '')'';
 END;
-';
\ No newline at end of file
+';